@@ -0,0 +1,10 @@
+"""
+Reusable pieces of the mojana-fields pipeline.
+
+Apart from qgis_adapters and qgis_tasks, modules depend only on NumPy, SciPy, Shapely and GDAL, so they
+can be imported by plain Python processes (e.g. worker pools) without starting QGIS. qgis_adapters holds the
+thin wrappers that take and return QGIS objects; qgis.core is only imported when one of them is called.
+
+The scripts run from the QGIS Python Console put the project directory on sys.path and import from here.
+Submodules are not imported by this file, so importing one never pulls in the others.
+"""
@@ -0,0 +1,78 @@
+"""
+Plane geometry used to measure camellones: angles, orientations and perpendicular widths.
+
+Points are (x, y) tuples and polygons are Shapely geometries. Shapely is imported inside the functions
+that need it, so the angle helpers are available even where Shapely is not installed. Widths are measured
+here (create_perpendicular_line_within_polygon); qgis_adapters wraps the same function for QgsGeometry.
+"""
+import math
+
+
+def calculate_angle(segment_start, segment_end):
+    # Direction of a segment, in radians
+    dx = segment_end[0] - segment_start[0]
+    dy = segment_end[1] - segment_start[1]
+    return math.atan2(dy, dx)
+
+
+def axial_difference(a, b):
+    # Difference between two directions, treating a and a+pi as the same direction
+    d = abs(a - b) % math.pi
+    return min(d, math.pi - d)
+
+
+def axial_mean(angles, weights):
+    """
+    Weighted circular mean of axial directions (a and a+pi are equivalent), in radians.
+    Returns None when the weights sum to zero.
+    """
+    s = 0.0
+    c = 0.0
+    wsum = 0.0
+    for a, w in zip(angles, weights):
+        # axial mean: use 2*a so a and a+pi are equivalent
+        s += w * math.sin(2 * a)
+        c += w * math.cos(2 * a)
+        wsum += w
+    if wsum > 0:
+        return 0.5 * math.atan2(s, c)
+    return None
+
+
+def perpendicular_ray(point, angle, max_length=1000):
+    # End points of a segment through point, perpendicular to angle, reaching max_length to each side
+    perp_angle = angle + math.pi / 2
+    start = (point[0] + math.cos(perp_angle) * max_length, point[1] + math.sin(perp_angle) * max_length)
+    end = (point[0] - math.cos(perp_angle) * max_length, point[1] - math.sin(perp_angle) * max_length)
+    return start, end
+
+
+def create_perpendicular_line_within_polygon(point, angle, polygon, max_length=1000):
+    """
+    Longest piece of the perpendicular ray through point that lies inside polygon, as a LineString
+    (empty if the ray misses the polygon). Its length is the polygon's width at point.
+    """
+    from shapely.geometry import LineString
+
+    intersect_geom = polygon.intersection(LineString(perpendicular_ray(point, angle, max_length)))
+    if intersect_geom.is_empty:
+        return LineString()
+
+    # Line parts only: a ray grazing a vertex can also leave points in the intersection
+    lines = [g for g in getattr(intersect_geom, "geoms", [intersect_geom]) if g.geom_type == "LineString"]
+    if not lines:
+        return LineString()
+    return max(lines, key=lambda ln: ln.length)
+
+
+def get_orientation(polygon):
+    # Orientation of a polygon's longest axis (longest edge of its minimum rotated rectangle), in degrees [0, 180)
+    if polygon is None or polygon.is_empty:
+        return float("nan")
+    try:
+        coords = list(polygon.minimum_rotated_rectangle.exterior.coords)
+        edges = [(coords[i], coords[i + 1]) for i in range(4)]
+        start, end = max(edges, key=lambda e: math.hypot(e[1][0] - e[0][0], e[1][1] - e[0][1]))
+        return math.degrees(calculate_angle(start, end)) % 180
+    except Exception:
+        return float("nan")
@@ -0,0 +1,143 @@
+"""
+Bulk GeoPackage writing with OGR.
+
+Features are inserted in transactions of batch_size features and the layer is created without a spatial
+index, which is built once when the writer is closed. Writing time then grows linearly with the number
+of features, instead of paying a commit and an R-tree update per feature.
+"""
+import os
+import math
+
+from osgeo import ogr, osr
+
+# Columns named like this need no change when outputs move from shapefile to GeoPackage (e.g. sf's $geometry)
+GEOMETRY_NAME = "geometry"
+
+
+class GpkgWriter:
+    """
+    Write one GeoPackage layer in bulk.
+
+        with GpkgWriter(path, "camellones", ogr.wkbMultiPolygon, crs_wkt, [("polygon_id", ogr.OFTInteger64)]) as w:
+            w.add(geometry_wkb, [polygon_id])
+
+    fields is a list of (name, OGR field type). add() takes the geometry as WKB (bytes) or an ogr.Geometry,
+    and the values in field order; None and NaN are written as NULL. An existing file at path is replaced.
+    """
+
+    def __init__(self, path, layer_name, geom_type, crs_wkt, fields, batch_size=50000, index_fields=()):
+        driver = ogr.GetDriverByName("GPKG")
+        if os.path.exists(path):
+            driver.DeleteDataSource(path)
+
+        srs = None
+        if crs_wkt:
+            srs = osr.SpatialReference()
+            srs.ImportFromWkt(crs_wkt)
+            srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+        self.path = path
+        self.batch_size = batch_size
+        self.index_fields = list(index_fields)
+        self.count = 0
+
+        self.dataset = driver.CreateDataSource(path)
+        if self.dataset is None:
+            raise RuntimeError(f"Failed to create GeoPackage: {path}")
+        self.layer = self.dataset.CreateLayer(
+            layer_name, srs, geom_type, options=["SPATIAL_INDEX=NO", f"GEOMETRY_NAME={GEOMETRY_NAME}"]
+        )
+        for name, field_type in fields:
+            self.layer.CreateField(ogr.FieldDefn(name, field_type))
+        self.defn = self.layer.GetLayerDefn()
+        self.layer.StartTransaction()
+
+    def add(self, geometry, values):
+        feature = ogr.Feature(self.defn)
+        if geometry is not None:
+            if not isinstance(geometry, ogr.Geometry):
+                geometry = ogr.CreateGeometryFromWkb(bytes(geometry))
+            feature.SetGeometryDirectly(geometry)
+        for i, value in enumerate(values):
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                feature.SetFieldNull(i)
+            else:
+                feature.SetField(i, value)
+        self.layer.CreateFeature(feature)
+
+        self.count += 1
+        if self.count % self.batch_size == 0:
+            self.layer.CommitTransaction()
+            self.layer.StartTransaction()
+
+    def close(self):
+        if self.dataset is None:
+            return
+        self.layer.CommitTransaction()
+
+        # Spatial index once, over all features, plus the requested attribute indexes
+        name = self.layer.GetName()
+        statements = [f"SELECT CreateSpatialIndex('{name}', '{GEOMETRY_NAME}')"]
+        statements += [f'CREATE INDEX "{name}_{field}_idx" ON "{name}" ("{field}")' for field in self.index_fields]
+        for sql in statements:
+            result = self.dataset.ExecuteSQL(sql)
+            if result is not None:
+                self.dataset.ReleaseResultSet(result)
+
+        self.layer = None
+        self.dataset = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def ogr_field_type(dtype):
+    # OGR field type for a NumPy / pandas dtype
+    kind = getattr(dtype, "kind", "O")
+    if kind in "iub":
+        return ogr.OFTInteger64
+    if kind == "f":
+        return ogr.OFTReal
+    return ogr.OFTString
+
+
+def write_geodataframe(gdf, path, layer_name=None, batch_size=50000, index_fields=()):
+    """
+    Write a GeoDataFrame to a GeoPackage through GpkgWriter. Geometry types are promoted to their multi
+    type, so layers mixing single and multi parts are valid. Returns the number of features written.
+    """
+    columns = [c for c in gdf.columns if c != gdf.geometry.name]
+    fields = [(c, ogr_field_type(gdf[c].dtype)) for c in columns]
+    bases = {t.replace("Multi", "") for t in gdf.geometry.geom_type.dropna()}
+    base = bases.pop() if len(bases) == 1 else "Unknown"
+    geom_type = {"Point": ogr.wkbMultiPoint, "LineString": ogr.wkbMultiLineString, "Polygon": ogr.wkbMultiPolygon}.get(
+        base, ogr.wkbUnknown
+    )
+    crs_wkt = gdf.crs.to_wkt() if gdf.crs is not None else None
+
+    with GpkgWriter(path, layer_name or layer_name_of(path), geom_type, crs_wkt, fields, batch_size, index_fields) as writer:
+        for geom, values in zip(gdf.geometry, gdf[columns].itertuples(index=False, name=None)):
+            ogr_geom = None
+            if geom is not None and not geom.is_empty:
+                ogr_geom = ogr.CreateGeometryFromWkb(geom.wkb)
+                if geom_type != ogr.wkbUnknown:
+                    ogr_geom = ogr.ForceTo(ogr_geom, geom_type)
+            writer.add(ogr_geom, [plain_value(v) for v in values])
+        return writer.count
+
+
+def plain_value(value):
+    # NumPy / pandas scalar -> Python value for OGR; missing values -> None
+    if value is None or type(value).__name__ in ("NAType", "NaTType"):
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def layer_name_of(path):
+    # Default layer name: the file name without extension
+    return os.path.splitext(os.path.basename(path))[0]
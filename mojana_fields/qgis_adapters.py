@@ -0,0 +1,231 @@
+"""
+Thin wrappers that apply the pure helpers to QGIS objects (layers, QgsGeometry, QgsRectangle).
+
+qgis.core is imported inside each function, so importing this module does not start or require QGIS.
+"""
+from mojana_fields import geometry, tiling
+
+
+def rect_bounds(rect):
+    # QgsRectangle as an (xmin, ymin, xmax, ymax) tuple
+    return rect.xMinimum(), rect.yMinimum(), rect.xMaximum(), rect.yMaximum()
+
+
+def to_shapely(geom):
+    # QgsGeometry -> Shapely geometry
+    from shapely import wkb
+    return wkb.loads(bytes(geom.asWkb()))
+
+
+def from_shapely(geom):
+    # Shapely geometry -> QgsGeometry (an empty geometry stays empty)
+    from qgis.core import QgsGeometry
+    if geom.is_empty:
+        return QgsGeometry.fromPolylineXY([])
+    qgs_geom = QgsGeometry()
+    qgs_geom.fromWkb(geom.wkb)
+    return qgs_geom
+
+
+def iter_tiles(extent, tile_size, halo):
+    # (core, halo) QgsRectangles of a tile_size grid covering extent
+    from qgis.core import QgsRectangle
+    for core, halo_rect in tiling.iter_tiles(rect_bounds(extent), tile_size, halo):
+        yield QgsRectangle(*core), QgsRectangle(*halo_rect)
+
+
+def owned_polygons(layer, core, halo):
+    """
+    Polygons belonging to one tile, as {polygon_id: geometry}. Candidates are read through the spatial
+    index with the halo rect and kept only if the centre of their bounding box lies in the tile core
+    (half-open on the upper edges), so a polygon straddling tile edges is processed exactly once.
+    """
+    from qgis.core import QgsFeatureRequest
+
+    owned = {}
+    core_bounds = rect_bounds(core)
+    for poly_feature in layer.getFeatures(QgsFeatureRequest().setFilterRect(halo)):
+        geom = poly_feature.geometry()
+        if geom is None or geom.isEmpty():
+            continue
+        if tiling.owns(core_bounds, rect_bounds(geom.boundingBox())):
+            owned[poly_feature["polygon_id"]] = geom
+    return owned
+
+
+def owned_extent(owned):
+    # Combined bounding box of a tile's polygons ({polygon_id: QgsGeometry}), for reading only their points
+    from qgis.core import QgsRectangle
+    extent = QgsRectangle()
+    extent.setMinimal()
+    for geom in owned.values():
+        extent.combineExtentWith(geom.boundingBox())
+    return extent
+
+
+def tile_halo(layer, margin=0.0):
+    """
+    Smallest halo with which owned_polygons sees every polygon of layer that a tile owns: a polygon reaches
+    at most half its larger bounding-box side beyond its centre, which lies in the core. Plus margin.
+    """
+    from qgis.core import QgsFeatureRequest
+    largest = 0.0
+    for feature in layer.getFeatures(QgsFeatureRequest().setNoAttributes()):
+        geom = feature.geometry()
+        if geom is not None and not geom.isEmpty():
+            box = geom.boundingBox()
+            largest = max(largest, box.width(), box.height())
+    return largest / 2 + margin
+
+
+def index_polygon_id(layer):
+    # Attribute index on polygon_id for intermediates read by polygon in later stages
+    layer.dataProvider().createAttributeIndex(layer.fields().indexFromName("polygon_id"))
+
+
+def calculate_angle(segment_start, segment_end):
+    # Direction of a segment between two QgsPointXY, in radians
+    return geometry.calculate_angle((segment_start.x(), segment_start.y()), (segment_end.x(), segment_end.y()))
+
+
+def create_perpendicular_line_within_polygon(point, angle, polygon_geom, max_length=1000):
+    # geometry.create_perpendicular_line_within_polygon for a QgsPointXY and a polygon QgsGeometry
+    perp = geometry.create_perpendicular_line_within_polygon(
+        (point.x(), point.y()), angle, to_shapely(polygon_geom), max_length
+    )
+    return from_shapely(perp)
+
+
+def ogr_fields(fields, drop=()):
+    """
+    OGR field definitions for the QgsFields of a layer, for mojana_fields.gpkg.GpkgWriter.
+    Returns (indices of the kept fields, [(name, OGR field type)]). GeoPackage's own fid column and the
+    names in drop are left out; types without an OGR counterpart here are written as strings.
+    """
+    from osgeo import ogr
+    from PyQt5.QtCore import QVariant
+
+    types = {
+        QVariant.Int: ogr.OFTInteger, QVariant.UInt: ogr.OFTInteger64, QVariant.LongLong: ogr.OFTInteger64,
+        QVariant.ULongLong: ogr.OFTInteger64, QVariant.Double: ogr.OFTReal, QVariant.Bool: ogr.OFTInteger,
+    }
+    drop = {name.lower() for name in drop} | {"fid"}
+    kept = [i for i, field in enumerate(fields) if field.name().lower() not in drop]
+    return kept, [(fields[i].name(), types.get(fields[i].type(), ogr.OFTString)) for i in kept]
+
+
+def ogr_value(value):
+    # QGIS attribute value -> value for GpkgWriter (NULL -> None, dates and other Qt types -> text)
+    from PyQt5.QtCore import QVariant
+
+    if isinstance(value, QVariant):
+        value = None if value.isNull() else value.value()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return value.toString() if hasattr(value, "toString") else str(value)
+
+
+def task_progress(task, done, total, every=1000):
+    """
+    Report progress to a QgsTask (task may be None outside one) every `every` items, and tell whether to
+    carry on: False once the task has been cancelled.
+    """
+    if task is None or done % every:
+        return True
+    if total:
+        task.setProgress(100.0 * done / total)
+    return not task.isCanceled()
+
+
+def write_longest_lines(skeleton_path, output_path, task=None):
+    """
+    Write the longest skeleton line of each polygon_id, with its length (and without GRASS's cat), to
+    output_path as a GeoPackage with an attribute index on polygon_id. Lengths are computed while reading,
+    so the skeleton layer is never edited. Touches no project or GUI state, so it can run in a QgsTask;
+    given that task, it reports progress and stops when the task is cancelled.
+    Returns (error code, error message).
+    """
+    from qgis.core import QgsVectorLayer, QgsVectorFileWriter
+    from osgeo import ogr
+    from mojana_fields.gpkg import GpkgWriter, layer_name_of
+
+    skeleton_layer = QgsVectorLayer(skeleton_path, "Skeleton Layer", "ogr")
+    if not skeleton_layer.isValid():
+        return QgsVectorFileWriter.ErrCreateDataSource, f"Failed to load skeleton layer: {skeleton_path}"
+
+    # Longest line of each polygon_id
+    longest_lines = {}
+    total = skeleton_layer.featureCount()
+    for n, feature in enumerate(skeleton_layer.getFeatures()):
+        if not task_progress(task, n, total):
+            return QgsVectorFileWriter.Canceled, "Cancelled"
+        length = feature.geometry().length()
+        polygon_id_value = feature["polygon_id"]
+        if polygon_id_value not in longest_lines or length > longest_lines[polygon_id_value][1]:
+            longest_lines[polygon_id_value] = (feature, length)
+
+    kept, fields = ogr_fields(skeleton_layer.fields(), drop=["cat", "length"])
+    try:
+        with GpkgWriter(output_path, layer_name_of(output_path), int(skeleton_layer.wkbType()),
+                        skeleton_layer.crs().toWkt(), fields + [("length", ogr.OFTReal)],
+                        index_fields=["polygon_id"]) as writer:
+            for feature, length in longest_lines.values():
+                attributes = feature.attributes()
+                writer.add(bytes(feature.geometry().asWkb()), [ogr_value(attributes[i]) for i in kept] + [length])
+    except RuntimeError as e:
+        return QgsVectorFileWriter.ErrCreateDataSource, str(e)
+    return QgsVectorFileWriter.NoError, ""
+
+
+def estimate_population(polygon_layer_path, out_polys_path, csv_output_path, sqm_per_house, people_per_house,
+                        task=None):
+    """
+    Houses and population of every platform: houses = floor(area / sqm_per_house), pop = houses * people_per_house.
+    Writes the platforms with sqm, houses and pop fields to out_polys_path (GeoPackage) and, with the
+    geometry as WKT, to csv_output_path. Touches no project or GUI state, so it can run in a QgsTask;
+    given that task, it reports progress and raises RuntimeError when the task is cancelled.
+    Returns the number of platforms written.
+    """
+    import csv
+    import math
+    from qgis.core import QgsVectorLayer
+    from osgeo import ogr
+    from mojana_fields.gpkg import GpkgWriter, layer_name_of
+
+    polygon_layer = QgsVectorLayer(polygon_layer_path, "Polygon Layer", "ogr")
+
+    # Copy original fields + add new ones
+    kept, fields = ogr_fields(polygon_layer.fields(), drop=["sqm", "houses", "pop"])
+    fields += [
+        ("sqm", ogr.OFTReal),        # area in square meters
+        ("houses", ogr.OFTInteger),  # floor(sqm/sqm_per_house)
+        ("pop", ogr.OFTInteger),     # houses * people_per_house
+    ]
+
+    with GpkgWriter(out_polys_path, layer_name_of(out_polys_path), ogr.wkbMultiPolygon,
+                    polygon_layer.crs().toWkt(), fields) as writer, open(csv_output_path, "w", newline="") as fp:
+        # Attributes plus geometry as WKT
+        w = csv.writer(fp)
+        w.writerow([name for name, _ in fields] + ["geometry"])
+
+        total = polygon_layer.featureCount()
+        for n, f in enumerate(polygon_layer.getFeatures()):
+            if not task_progress(task, n, total):
+                raise RuntimeError("Cancelled")
+            geom = f.geometry()
+            if geom is None or geom.isEmpty():
+                continue
+
+            # IMPORTANT: area units depend on CRS. If CRS is projected in meters, this is m^2.
+            sqm = geom.area()
+
+            houses = int(math.floor(sqm / sqm_per_house))
+            pop = houses * people_per_house
+
+            attributes = f.attributes()
+            values = [ogr_value(attributes[i]) for i in kept] + [float(sqm), houses, pop]
+            multi = ogr.ForceToMultiPolygon(ogr.CreateGeometryFromWkb(bytes(geom.asWkb())))
+            writer.add(multi, values)
+            w.writerow(["" if v is None else v for v in values] + [geom.asWkt()])
+
+        return writer.count
@@ -0,0 +1,170 @@
+"""
+Stage graph run through the QGIS task manager, so long stages run in the background while QGIS stays usable.
+
+Each step is a QgsTask: Processing algorithms run as QgsProcessingAlgRunnerTask, Python steps as
+QgsTask.fromFunction. A step starts once the steps it depends on have finished, so independent branches
+run at the same time; if a step fails or is cancelled, the steps depending on it are cancelled.
+Progress shows in the QGIS task manager (status bar). Steps run in worker threads and must not touch the
+project or the GUI; their on_finished callbacks run in the main thread, where adding layers is safe.
+
+Algorithms flagged FlagNoThreading (e.g. the GRASS provider's) cannot run in a worker thread: they run
+in the main thread once their dependencies are done, and QGIS is unresponsive while they do.
+A Python step can only be cancelled or report progress if its function takes the task (pass_task=True)
+and calls task.setProgress() / checks task.isCanceled() itself; otherwise cancelling takes effect only
+before it starts, and its progress jumps from 0 to 100 %.
+
+qgis.core is imported inside the functions, as in qgis_adapters.
+"""
+
+
+class StageGraph:
+    """
+    Steps and their dependencies, submitted together with submit().
+
+        graph = StageGraph()
+        graph.add_algorithm("simplify", "native:simplifygeometries", {...})
+        graph.add_function("longest lines", write_longest_lines, path, out, depends_on=["simplify"])
+        graph.submit()
+        graph.cancel()   # cancels every step not yet finished
+    """
+
+    def __init__(self):
+        self.tasks = {}
+        self.dependencies = {}
+        self.status = {}
+        # Contexts and feedback objects must outlive their algorithm tasks
+        self._keep_alive = []
+
+    def add_function(self, name, function, *args, depends_on=(), on_finished=None, pass_task=False, **kwargs):
+        """
+        Add a Python step running function(*args, **kwargs) in a worker thread. on_finished(result) is
+        called in the main thread once it has succeeded. With pass_task, the QgsTask is passed as
+        function(..., task=task), for progress reporting and cancellation.
+        """
+        from qgis.core import QgsTask
+
+        def run(task):
+            if task.isCanceled():
+                raise RuntimeError("cancelled before starting")
+            if pass_task:
+                return function(*args, task=task, **kwargs)
+            return function(*args, **kwargs)
+
+        def finished(exception, result=None):
+            if exception is not None:
+                print(f"[{name}] {exception}")
+            self._set_status(name, "done" if exception is None else "failed")
+            if exception is None and on_finished is not None:
+                on_finished(result)
+
+        task = QgsTask.fromFunction(name, run, on_finished=finished, flags=QgsTask.CanCancel)
+        return self._add(name, task, depends_on)
+
+    def add_algorithm(self, name, algorithm_id, parameters, depends_on=(), on_finished=None):
+        """
+        Add a Processing algorithm step. on_finished(results) is called in the main thread once it has
+        succeeded. Parameters should use file paths: layers cannot be passed between threads.
+        """
+        from qgis.core import (
+            QgsApplication, QgsProcessingAlgorithm, QgsProcessingAlgRunnerTask, QgsProcessingContext,
+            QgsProcessingFeedback
+        )
+
+        algorithm = QgsApplication.processingRegistry().algorithmById(algorithm_id)
+        if algorithm is None:
+            raise ValueError(f"Processing algorithm not found: {algorithm_id}")
+        if algorithm.flags() & QgsProcessingAlgorithm.FlagNoThreading:
+            return self._add_main_thread_algorithm(name, algorithm_id, parameters, depends_on, on_finished)
+
+        context = QgsProcessingContext()
+        feedback = QgsProcessingFeedback()
+        task = QgsProcessingAlgRunnerTask(algorithm, parameters, context, feedback)
+        task.setDescription(name)
+
+        def executed(successful, results):
+            self._set_status(name, "done" if successful else "failed")
+            if successful and on_finished is not None:
+                on_finished(results)
+
+        task.executed.connect(executed)
+        self._keep_alive.append((context, feedback, executed))
+        return self._add(name, task, depends_on)
+
+    def _add_main_thread_algorithm(self, name, algorithm_id, parameters, depends_on, on_finished):
+        """
+        Step for an algorithm that must not leave the main thread. Its task only waits for the dependencies;
+        the algorithm runs in the task's completion callback, which the task manager calls in the main
+        thread before it starts any dependent step. If the algorithm fails, its dependants are cancelled.
+        """
+        from qgis.core import QgsTask
+        import processing
+
+        def wait(task):
+            if task.isCanceled():
+                raise RuntimeError("cancelled before starting")
+
+        def finished(exception, result=None):
+            if exception is not None:
+                print(f"[{name}] {exception}")
+                self._set_status(name, "failed")
+                return
+            print(f"[{name}] running in the main thread (the algorithm does not support threads)")
+            try:
+                results = processing.run(algorithm_id, parameters)
+            except Exception as e:
+                print(f"[{name}] {e}")
+                self._set_status(name, "failed")
+                self._cancel_dependants(name)
+                return
+            self._set_status(name, "done")
+            if on_finished is not None:
+                on_finished(results)
+
+        task = QgsTask.fromFunction(name, wait, on_finished=finished, flags=QgsTask.CanCancel)
+        return self._add(name, task, depends_on)
+
+    def _cancel_dependants(self, name):
+        # Cancel every step that depends, directly or not, on step name
+        for other, deps in self.dependencies.items():
+            if name in deps and self.status[other] == "queued":
+                self.tasks[other].cancel()
+                self._cancel_dependants(other)
+
+    def _add(self, name, task, depends_on):
+        if name in self.tasks:
+            raise ValueError(f"Duplicate step: {name}")
+        missing = [d for d in depends_on if d not in self.tasks]
+        if missing:
+            raise ValueError(f"Step {name} depends on steps not added yet: {', '.join(missing)}")
+        self.tasks[name] = task
+        self.dependencies[name] = list(depends_on)
+        self.status[name] = "queued"
+
+        # Steps cancelled by the user or by the task manager (a dependency failed) end here
+        task.taskTerminated.connect(lambda: self._set_status(name, "cancelled" if task.isCanceled() else "failed"))
+        return task
+
+    def _set_status(self, name, status):
+        # The first final status reported for a step wins
+        if self.status[name] != "queued":
+            return
+        self.status[name] = status
+        done = sum(1 for s in self.status.values() if s == "done")
+        print(f"[{name}] {status} ({done}/{len(self.tasks)} steps done)")
+
+    def submit(self):
+        # Hand every step to the task manager, in the order added (dependencies come first)
+        from qgis.core import QgsApplication, QgsTaskManager
+
+        manager = QgsApplication.taskManager()
+        for name, task in self.tasks.items():
+            dependencies = [self.tasks[d] for d in self.dependencies[name]]
+            manager.addTask(QgsTaskManager.TaskDefinition(task, dependencies))
+
+    def cancel(self):
+        for name, task in self.tasks.items():
+            if self.status[name] == "queued":
+                task.cancel()
+
+    def finished(self):
+        return all(s != "queued" for s in self.status.values())
@@ -0,0 +1,121 @@
+"""
+Raster helpers: band masks, DEM blocks and the DEM window sampler.
+
+Arrays are NumPy; GDAL is imported only by the functions that read, write or rasterize, so the array
+helpers load quickly in worker processes. gt is a GDAL geotransform.
+"""
+import numpy as np
+
+
+def range_mask(values, min_val, max_val):
+    # 1 where min_val <= value <= max_val, else 0
+    return ((values >= min_val) & (values <= max_val)).astype(np.uint8)
+
+
+def create_range_mask(input_path, band, min_val, max_val, output_path, block_rows=1024):
+    """
+    Writes a GeoTIFF where pixels in [min_val, max_val] become 1, else 0, reading and writing block_rows
+    rows at a time. Returns 0 on success, as QgsRasterCalculator.processCalculation() did.
+    """
+    from osgeo import gdal
+
+    src = gdal.Open(input_path)
+    if not src:
+        raise RuntimeError(f"Failed to open raster: {input_path}")
+    src_band = src.GetRasterBand(band)
+
+    dst = gdal.GetDriverByName("GTiff").Create(output_path, src.RasterXSize, src.RasterYSize, 1, gdal.GDT_Byte)
+    dst.SetGeoTransform(src.GetGeoTransform())
+    dst.SetProjection(src.GetProjection())
+    dst_band = dst.GetRasterBand(1)
+
+    nodata = src_band.GetNoDataValue()
+    for yoff in range(0, src.RasterYSize, block_rows):
+        rows = min(block_rows, src.RasterYSize - yoff)
+        values = src_band.ReadAsArray(0, yoff, src.RasterXSize, rows)
+        mask = range_mask(values, min_val, max_val)
+        if nodata is not None:
+            mask[values == nodata] = 0
+        dst_band.WriteArray(mask, 0, yoff)
+
+    dst_band.FlushCache()
+    dst = None
+    return 0
+
+
+def pixel_of(gt, x, y, xsize, ysize):
+    # Raster pixel (column, row) containing (x, y), clamped to raster bounds
+    px = int((x - gt[0]) / gt[1])
+    py = int((y - gt[3]) / gt[5])
+    px = min(max(px, 0), xsize - 1)
+    py = min(max(py, 0), ysize - 1)
+    return px, py
+
+
+def block_window(gt, xsize, ysize, bounds, margin_px):
+    """
+    Pixel window covering bounds (xmin, ymin, xmax, ymax) plus margin_px on every side, clipped to the
+    raster, as (column offset, row offset, columns, rows).
+    """
+    corners = [pixel_of(gt, bounds[0], bounds[1], xsize, ysize), pixel_of(gt, bounds[2], bounds[3], xsize, ysize)]
+    xoff = max(min(c[0] for c in corners) - margin_px, 0)
+    yoff = max(min(c[1] for c in corners) - margin_px, 0)
+    xend = min(max(c[0] for c in corners) + margin_px + 1, xsize)
+    yend = min(max(c[1] for c in corners) + margin_px + 1, ysize)
+    return xoff, yoff, xend - xoff, yend - yoff
+
+
+def rasterize_mask(layer, gt, xoff, yoff, shape, projection=""):
+    """
+    Boolean array of the given shape marking the cells of a raster block (starting at pixel xoff, yoff of
+    the raster with geotransform gt) covered by the features of an OGR layer.
+    """
+    from osgeo import gdal
+
+    rows, cols = shape
+    x0, y0 = gt[0] + xoff * gt[1], gt[3] + yoff * gt[5]
+    x1, y1 = x0 + cols * gt[1], y0 + rows * gt[5]
+
+    block_ds = gdal.GetDriverByName("MEM").Create("", cols, rows, 1, gdal.GDT_Byte)
+    block_ds.SetGeoTransform((x0, gt[1], 0, y0, 0, gt[5]))
+    block_ds.SetProjection(projection)
+
+    # Only the features over the block's footprint are burnt
+    layer.SetSpatialFilterRect(min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+    gdal.RasterizeLayer(block_ds, [1], layer, burn_values=[1])
+    layer.SetSpatialFilter(None)
+    return block_ds.GetRasterBand(1).ReadAsArray().astype(bool)
+
+
+def mask_block(block, masked, source_nodata=None, nodata=-9999):
+    # Copy of block as float32 with the masked cells, and the source's NoData cells, set to nodata
+    block = block.astype(np.float32)
+    if source_nodata is not None:
+        masked = masked | (block == source_nodata)
+    block[masked] = nodata
+    return block
+
+
+def sample_window(block, row, col, buffer_px, nodata=-9999):
+    """
+    Elevation at cell (row, col) of a DEM block and the min / max of the (2 * buffer_px + 1) cell window
+    around it, ignoring NoData, NaN and zero cells. A point on such a cell takes the window mean instead;
+    with no valid cells at all, the point is 0 and min / max fall back to it.
+    Returns (elevation, min elevation, max elevation).
+    """
+    elev = block[row, col]
+
+    window = block[max(row - buffer_px, 0):row + buffer_px + 1, max(col - buffer_px, 0):col + buffer_px + 1]
+    vals = window[(window != nodata) & ~np.isnan(window)]
+    vals_pos = vals[vals > 0]  # ignore zeros
+
+    # Fallback for invalid/zero/nodata point elevation
+    if elev == nodata or np.isnan(elev) or elev == 0:
+        elev = float(np.mean(vals_pos)) if vals_pos.size > 0 else 0.0
+    else:
+        elev = float(elev)
+
+    # Min/max from neighborhood (fallback to elev if neighborhood has no valid values)
+    min_elev = float(np.min(vals_pos)) if vals_pos.size > 0 else elev
+    max_elev = float(np.max(vals_pos)) if vals_pos.size > 0 else elev
+    return elev, min_elev, max_elev
@@ -0,0 +1,151 @@
+"""
+Streaming statistics: values are folded in one at a time, so memory does not grow with the number of stations.
+bootstrap_group_sums is the exception: it resamples the stations of every polygon at once, with NumPy.
+"""
+import numpy as np
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate (P-square algorithm, Jain & Chlamtac 1985).
+    Keeps five markers regardless of the number of observations.
+    """
+
+    def __init__(self, q):
+        self.q = q
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self.increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def add(self, x):
+        h = self.heights
+        if len(h) < 5:
+            h.append(x)
+            h.sort()
+            return
+
+        # Find the cell containing x and update extreme markers
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= h[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Adjust the three middle markers (parabolic, falling back to linear)
+        n = self.positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                hp = h[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not h[i - 1] < hp < h[i + 1]:
+                    hp = h[i] + d * (h[i + d] - h[i]) / (n[i + d] - n[i])
+                h[i] = hp
+                n[i] += d
+
+    def value(self):
+        h = self.heights
+        if not h:
+            return float("nan")
+        if len(h) < 5:
+            # Few observations: exact quantile from the sorted sample
+            return h[min(int(round(self.q * (len(h) - 1))), len(h) - 1)]
+        return h[2]
+
+
+class PolygonWidthStats:
+    """
+    Running width statistics for one polygon, updated station by station.
+    area integrates width over distance the same way as 1-calculate_volumes.R
+    (each station's width times the distance from the previous station).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.length = 0.0
+        self.area = 0.0
+        self.last_distance = None
+        self.quantiles = [P2Quantile(0.25), P2Quantile(0.5), P2Quantile(0.75)]
+
+    def add(self, distance, width):
+        # Welford update for mean / variance
+        self.count += 1
+        delta = width - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (width - self.mean)
+
+        self.min = min(self.min, width)
+        self.max = max(self.max, width)
+        self.length = max(self.length, distance)
+
+        # Stations arrive in order of distance along the centre line
+        if self.last_distance is not None:
+            self.area += width * (distance - self.last_distance)
+        self.last_distance = distance
+
+        for q in self.quantiles:
+            q.add(width)
+
+    def row(self):
+        variance = self.m2 / (self.count - 1) if self.count > 1 else 0.0
+        return [
+            self.count, self.length, self.mean, variance, self.min, self.max,
+            *[q.value() for q in self.quantiles], self.area
+        ]
+
+
+def bootstrap_group_sums(values, starts, n_replicates=1000, seed=None, max_draws=2 ** 22):
+    """
+    Bootstrap replicates of the per-group sums of values, for all groups in one vectorised operation.
+
+    values holds the rows of every group one after another (N values, or N x k columns resampled together);
+    starts is the first row of each group, increasing, with no empty groups. In every replicate each group
+    redraws as many rows as it has, with replacement, from its own rows only. Replicates are drawn in chunks
+    of at most max_draws rows, so memory stays bounded whatever n_replicates is. seed is anything
+    np.random.default_rng accepts, including a Generator shared across calls.
+    Returns an array of shape (n_groups, n_replicates), or (n_groups, n_replicates, k) for 2-D values.
+    """
+    values = np.asarray(values, dtype=float)
+    starts = np.asarray(starts, dtype=np.int64)
+    counts = np.diff(np.append(starts, len(values)))
+    if np.any(counts <= 0):
+        raise ValueError("bootstrap_group_sums needs increasing starts and non-empty groups")
+
+    # Group offset and size behind every row, so one uniform draw per row picks a row of the same group.
+    # Single-precision uniforms and 32-bit row numbers are several times faster than rng.integers here.
+    index_type = np.int32 if len(values) < 2 ** 31 else np.int64
+    base = np.repeat(starts, counts).astype(index_type)
+    size = np.repeat(counts, counts).astype(np.float32)
+    last = (size - 1).astype(index_type)
+
+    # Columns are gathered one at a time from contiguous copies, which is much faster than gathering rows
+    columns = values.reshape(len(values), -1).T.copy()
+
+    rng = np.random.default_rng(seed)
+    sums = np.empty((len(starts), n_replicates, len(columns)))
+    per_chunk = max(1, max_draws // max(len(values), 1))
+    for r0 in range(0, n_replicates, per_chunk):
+        r1 = min(r0 + per_chunk, n_replicates)
+        offsets = (rng.random((r1 - r0, len(values)), dtype=np.float32) * size).astype(index_type)
+        rows = base + np.minimum(offsets, last)
+        for j, column in enumerate(columns):
+            sums[:, r0:r1, j] = np.add.reduceat(column[rows], starts, axis=1).T
+    return sums.reshape((len(starts), n_replicates) + values.shape[1:])
@@ -0,0 +1,26 @@
+"""
+Square tiles for processing a mapped area piece by piece.
+
+Rectangles are (xmin, ymin, xmax, ymax) tuples in map units. A polygon belongs to the one tile whose core
+contains the centre of its bounding box; the halo around the core is read so that polygons reaching out
+of the tile are still seen whole.
+"""
+
+
+def iter_tiles(bounds, tile_size, halo):
+    # (core, halo) rectangles of a tile_size grid covering bounds
+    xmin, ymin, xmax, ymax = bounds
+    nx = int((xmax - xmin) // tile_size) + 1
+    ny = int((ymax - ymin) // tile_size) + 1
+    for ix in range(nx):
+        for iy in range(ny):
+            x0 = xmin + ix * tile_size
+            y0 = ymin + iy * tile_size
+            yield (x0, y0, x0 + tile_size, y0 + tile_size), (x0 - halo, y0 - halo, x0 + tile_size + halo, y0 + tile_size + halo)
+
+
+def owns(core, bbox):
+    # Whether the tile core owns a polygon with bounding box bbox (half-open on the upper edges)
+    cx = (bbox[0] + bbox[2]) / 2
+    cy = (bbox[1] + bbox[3]) / 2
+    return core[0] <= cx < core[2] and core[1] <= cy < core[3]
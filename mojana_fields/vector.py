@@ -0,0 +1,84 @@
+"""
+OGR vector layers read as Shapely geometries, tile by tile.
+
+The counterparts of the layer helpers in qgis_adapters (owned_polygons, owned_extent, tile_halo) for stages
+that run without QGIS: the same tiling rules, on OGR layers and Shapely geometries. Rectangles are
+(xmin, ymin, xmax, ymax) tuples, as in tiling.
+"""
+from osgeo import ogr
+from shapely import wkb
+
+from mojana_fields import tiling
+
+
+def open_layer(path):
+    # (dataset, first layer) of a vector file; the dataset must stay referenced while the layer is used
+    dataset = ogr.Open(path)
+    if dataset is None:
+        raise RuntimeError(f"Failed to open vector layer: {path}")
+    return dataset, dataset.GetLayer()
+
+
+def layer_bounds(layer):
+    # Extent of an OGR layer as (xmin, ymin, xmax, ymax)
+    xmin, xmax, ymin, ymax = layer.GetExtent()
+    return xmin, ymin, xmax, ymax
+
+
+def layer_crs_wkt(layer):
+    # CRS of an OGR layer as WKT (None if it has none), for mojana_fields.gpkg.GpkgWriter
+    srs = layer.GetSpatialRef()
+    return srs.ExportToWkt() if srs is not None else None
+
+
+def iter_features(layer, bounds=None):
+    """
+    Yield (feature, Shapely geometry) for the features whose bounding box meets bounds (every feature if
+    bounds is None), read through the layer's spatial index. Features without geometry are skipped.
+    The layer's spatial filter is reset once the iteration ends.
+    """
+    if bounds is not None:
+        layer.SetSpatialFilterRect(*bounds)
+    layer.ResetReading()
+    try:
+        for feature in layer:
+            geom = feature.GetGeometryRef()
+            if geom is None or geom.IsEmpty():
+                continue
+            yield feature, wkb.loads(bytes(geom.ExportToWkb()))
+    finally:
+        layer.SetSpatialFilter(None)
+
+
+def tile_halo(layer, margin=0.0):
+    # Half the largest bounding box side of any feature: a halo that reaches every polygon a tile owns
+    largest = 0.0
+    layer.ResetReading()
+    for feature in layer:
+        geom = feature.GetGeometryRef()
+        if geom is not None and not geom.IsEmpty():
+            xmin, xmax, ymin, ymax = geom.GetEnvelope()
+            largest = max(largest, xmax - xmin, ymax - ymin)
+    return largest / 2 + margin
+
+
+def owned_polygons(layer, core, halo):
+    """
+    Polygons belonging to one tile, as {polygon_id: Shapely geometry}. Candidates are read with the halo
+    rect and kept only if the centre of their bounding box lies in the tile core, as in
+    qgis_adapters.owned_polygons.
+    """
+    owned = {}
+    for feature, geom in iter_features(layer, halo):
+        if tiling.owns(core, geom.bounds):
+            owned[feature.GetField("polygon_id")] = geom
+    return owned
+
+
+def owned_extent(owned):
+    # Combined bounding box of a tile's polygons ({polygon_id: Shapely geometry})
+    bounds = [geom.bounds for geom in owned.values()]
+    return (
+        min(b[0] for b in bounds), min(b[1] for b in bounds),
+        max(b[2] for b in bounds), max(b[3] for b in bounds),
+    )
@@ -3,8 +3,8 @@ from qgis.core import (
     QgsVectorLayer,
     QgsProject
 )
-from qgis.analysis import QgsRasterCalculator, QgsRasterCalculatorEntry
 import processing
+import sys
 import os
 
 
@@ -18,6 +18,7 @@ if not os.path.isfile(raster_path):
     )
 
 # Band / threshold for "blue mask", but could use any other band or threshold as suited to your case study area
+# (3-explore_blue_thresholds_qgis.py compares candidate thresholds and sieve sizes in a single read of the band)
 blue_band = 3
 blue_min, blue_max = 75, 100
 
@@ -25,6 +26,11 @@ blue_min, blue_max = 75, 100
 project_path = os.path.dirname(QgsProject.instance().fileName())
 out_dir = os.path.join(project_path,"outputs",  "temp")
 
+# Band range mask from the mojana_fields package at the project root
+if project_path not in sys.path:
+    sys.path.insert(0, project_path)
+from mojana_fields.raster import create_range_mask as write_range_mask
+
 blue_mask_path            = os.path.join(out_dir, "blue_mask.tif")
 no_data_mask_path         = os.path.join(out_dir, "no_data_blue_mask.tif")
 filled_mask_path          = os.path.join(out_dir, "filled_blue_mask.tif")
@@ -56,27 +62,9 @@ print(f"Raster loaded: {raster_layer.name()} | bands: {raster_layer.bandCount()}
 def create_range_mask(layer: QgsRasterLayer, band: int, min_val: float, max_val: float, output_path: str) -> int:
     """
     Writes a raster where pixels in [min_val, max_val] become 1, else 0.
-    Returns QgsRasterCalculator processCalculation() code (0 = success).
+    Returns 0 on success (as the QgsRasterCalculator code it replaces).
     """
-    entry = QgsRasterCalculatorEntry()
-    entry.ref = f"{layer.name()}@{band}"
-    entry.raster = layer
-    entry.bandNumber = band
-    entries = [entry]
-
-    # robust boolean math: comparisons yield 0/1; multiply to represent AND; then *1 to force numeric output
-    expr = f"(({entry.ref} >= {min_val}) * ({entry.ref} <= {max_val})) * 1"
-
-    calc = QgsRasterCalculator(
-        expr,
-        output_path,
-        "GTiff",
-        layer.extent(),
-        layer.width(),
-        layer.height(),
-        entries
-    )
-    return calc.processCalculation()
+    return write_range_mask(layer.source(), band, min_val, max_val, output_path)
 
 
 # ----------------------------
@@ -84,7 +72,7 @@ def create_range_mask(layer: QgsRasterLayer, band: int, min_val: float, max_val:
 # ----------------------------
 rc = create_range_mask(raster_layer, blue_band, blue_min, blue_max, blue_mask_path)
 if rc != 0:
-    raise RuntimeError(f"Failed to create initial mask. RasterCalculator code: {rc}")
+    raise RuntimeError(f"Failed to create initial mask. Return code: {rc}")
 print("Initial (0/1) mask created.")
 
 blue_mask_layer = QgsRasterLayer(blue_mask_path, "Blue_Mask_0_1")
@@ -141,7 +129,7 @@ QgsProject.instance().addMapLayer(filled_mask_layer)
 # ----------------------------
 rc2 = create_range_mask(filled_mask_layer, 1, 0.5, 1e9, filled_binary_path)
 if rc2 != 0:
-    raise RuntimeError(f"Failed to re-binarize filled raster. RasterCalculator code: {rc2}")
+    raise RuntimeError(f"Failed to re-binarize filled raster. Return code: {rc2}")
 print("Re-binarized filled raster back to 0/1.")
 
 filled_binary_layer = QgsRasterLayer(filled_binary_path, "Blue_Mask_Filled_Binary_0_1")
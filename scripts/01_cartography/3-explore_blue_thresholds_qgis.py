@@ -0,0 +1,154 @@
+from qgis.core import QgsProject
+from osgeo import gdal
+from scipy import ndimage
+import numpy as np
+import csv
+import os
+
+
+# Explore blue-band thresholds and sieve sizes for 2-polygonise_satellite_qgis.py without running
+# its full chain for every guess: the band is read once, and every (min, max, sieve) combination is
+# evaluated from that single read. Only the chosen setting then needs to go through polygonization.
+
+# NB! Need to set raster path to satellite imagery downloaded using your own API in script "download_tiles.R"
+raster_path = ""
+
+if not os.path.isfile(raster_path):
+    raise FileNotFoundError(
+        f'Could not load .tif raster at:\n  {raster_path}\n\n'
+        'NB! Need to set raster path to satellite imagery downloaded using your own API in script "download_tiles.R".'
+    )
+
+# Band and candidate settings (current defaults in 2-polygonise_satellite_qgis.py: 75, 100, 500)
+blue_band = 3
+blue_min_values = [65, 70, 75, 80, 85]
+blue_max_values = [95, 100, 105, 110]
+sieve_thresholds = [100, 250, 500, 1000]   # pixels, as gdal:sieve THRESHOLD
+
+# Same gap filling as gdal:fillnodata in the polygonisation chain
+fill_distance = 3        # pixels
+
+# Tile size (pixels) for the per-tile band statistics
+tile_px = 512
+
+# Outputs
+project_path = os.path.dirname(QgsProject.instance().fileName())
+out_dir = os.path.join(project_path, "outputs", "temp")
+exploration_csv_path = os.path.join(out_dir, "blue_threshold_exploration.csv")
+histogram_csv_path = os.path.join(out_dir, "blue_band_histogram.csv")
+tile_stats_csv_path = os.path.join(out_dir, "blue_band_tile_stats.csv")
+
+
+# ----------------------------
+# Read the band once
+# ----------------------------
+dataset = gdal.Open(raster_path)
+if not dataset:
+    raise RuntimeError(f"Failed to open raster: {raster_path}")
+
+band = dataset.GetRasterBand(blue_band)
+values = band.ReadAsArray()
+nodata = band.GetNoDataValue()
+valid = np.ones(values.shape, dtype=bool) if nodata is None else values != nodata
+
+gt = dataset.GetGeoTransform()
+pixel_area = abs(gt[1] * gt[5])  # in (layer units)^2; degrees^2 for EPSG:4326 tiles
+print(f"Band {blue_band} read: {values.shape[1]} x {values.shape[0]} pixels")
+
+
+# ----------------------------
+# Pixel histogram (masked area for any [min, max] follows from its cumulative sum)
+# ----------------------------
+dn = np.rint(values[valid]).astype(np.int64)
+dn_offset = int(dn.min()) if dn.size else 0
+histogram = np.bincount(dn - dn_offset)
+cumulative = np.concatenate([[0], np.cumsum(histogram)])
+
+
+def pixels_in_range(min_val, max_val):
+    lo = min(max(int(np.ceil(min_val)) - dn_offset, 0), len(histogram))
+    hi = min(max(int(np.floor(max_val)) - dn_offset + 1, 0), len(histogram))
+    return int(cumulative[hi] - cumulative[lo]) if hi > lo else 0
+
+
+with open(histogram_csv_path, "w", newline="") as fp:
+    w = csv.writer(fp)
+    w.writerow(["dn", "pixels"])
+    for i, count in enumerate(histogram):
+        w.writerow([i + dn_offset, int(count)])
+
+
+# ----------------------------
+# Per-tile statistics
+# ----------------------------
+with open(tile_stats_csv_path, "w", newline="") as fp:
+    w = csv.writer(fp)
+    w.writerow(["tile_x", "tile_y", "valid_pixels", "mean", "std", "min", "max"] +
+               [f"share_{lo}_{hi}" for lo in blue_min_values for hi in blue_max_values])
+    for ty in range(0, values.shape[0], tile_px):
+        for tx in range(0, values.shape[1], tile_px):
+            tile = values[ty:ty + tile_px, tx:tx + tile_px][valid[ty:ty + tile_px, tx:tx + tile_px]]
+            if tile.size == 0:
+                continue
+            shares = [float(np.mean((tile >= lo) & (tile <= hi))) for lo in blue_min_values for hi in blue_max_values]
+            w.writerow([tx // tile_px, ty // tile_px, tile.size, float(tile.mean()), float(tile.std()),
+                        float(tile.min()), float(tile.max())] + shares)
+
+
+# ----------------------------
+# Evaluate every (min, max, sieve) combination
+# ----------------------------
+# 8-connectedness, as EIGHT_CONNECTEDNESS in gdal:sieve / gdal:polygonize
+connectivity = np.ones((3, 3), dtype=bool)
+
+# fillnodata spreads the mask's 1s into NoData gaps up to fill_distance pixels away and the result is
+# re-binarized, which amounts to a dilation by a disk of that radius
+yy, xx = np.mgrid[-fill_distance:fill_distance + 1, -fill_distance:fill_distance + 1]
+fill_disk = (xx ** 2 + yy ** 2) <= fill_distance ** 2
+
+rows = []
+for blue_min in blue_min_values:
+    for blue_max in blue_max_values:
+        if blue_min > blue_max:
+            continue
+
+        mask = (values >= blue_min) & (values <= blue_max) & valid
+        filled = ndimage.binary_dilation(mask, structure=fill_disk) & valid
+
+        # Label once; every sieve threshold is then read from the component sizes
+        labels, n_fg = ndimage.label(filled, structure=connectivity)
+        fg_sizes = np.bincount(labels.ravel())[1:]
+        bg_labels, n_bg = ndimage.label(~filled & valid, structure=connectivity)
+        bg_sizes = np.bincount(bg_labels.ravel())[1:]
+
+        for threshold in sieve_thresholds:
+            # Sieve removes foreground regions below threshold and fills background holes below it
+            kept = fg_sizes[fg_sizes >= threshold]
+            holes_filled = int(bg_sizes[bg_sizes < threshold].sum())
+            final_pixels = int(kept.sum()) + holes_filled
+
+            rows.append([
+                blue_min, blue_max, threshold,
+                pixels_in_range(blue_min, blue_max) * pixel_area,
+                int(filled.sum()) * pixel_area,
+                final_pixels * pixel_area,
+                n_fg, kept.size, n_fg - kept.size,
+                float(np.percentile(kept, 10)) if kept.size else 0.0,
+                float(np.median(kept)) if kept.size else 0.0,
+                float(np.percentile(kept, 90)) if kept.size else 0.0,
+                int(kept.max()) if kept.size else 0,
+            ])
+        print(f"Evaluated blue range [{blue_min}, {blue_max}]: {n_fg} components before sieving")
+
+with open(exploration_csv_path, "w", newline="") as fp:
+    w = csv.writer(fp)
+    w.writerow([
+        "blue_min", "blue_max", "sieve_threshold",
+        "masked_area", "filled_area", "final_area",
+        "components_before_sieve", "components", "components_removed",
+        "size_p10_px", "size_median_px", "size_p90_px", "size_max_px",
+    ])
+    w.writerows(rows)
+
+print(f"Done. {len(rows)} combinations written to: {exploration_csv_path}")
+print("Set blue_min, blue_max and the sieve THRESHOLD in 2-polygonise_satellite_qgis.py to the chosen setting.")
@@ -1,171 +1,452 @@
 import os
+import sys
 import csv
 import math
-import processing
-
-from qgis.core import (
-    QgsVectorLayer,
-    QgsProject,
-    QgsFeature,
-    QgsGeometry,
-    QgsField,
-    QgsPointXY,
-    QgsVectorFileWriter,
-    QgsFeatureRequest,
-    QgsApplication,
+import numpy as np
+from osgeo import gdal, ogr
+from scipy import ndimage
+from shapely.geometry import LineString
+from shapely.prepared import prep
+
+# Get current project path (the batch runner passes it as PROJECT_DIR and does not start QGIS)
+p = globals().get("PROJECT_DIR") or os.path.dirname(QgsProject.instance().fileName())
+
+# Shared helpers from the mojana_fields package at the project root
+if p not in sys.path:
+    sys.path.insert(0, p)
+from mojana_fields import tiling
+from mojana_fields.geometry import axial_mean, calculate_angle, create_perpendicular_line_within_polygon
+from mojana_fields.gpkg import GpkgWriter, layer_name_of
+from mojana_fields.stats import PolygonWidthStats
+from mojana_fields.vector import (
+    iter_features,
+    layer_bounds,
+    layer_crs_wkt,
+    open_layer,
+    owned_extent,
+    owned_polygons,
+    tile_halo,
 )
-from PyQt5.QtCore import QVariant
 
-# Get current project path
-p = os.path.dirname(QgsProject.instance().fileName())
-
-# Paths
+# Paths (intermediates are spatially indexed GeoPackages)
 polygon_layer_path = os.path.join(p, "spatial_data", "shapefiles", "camellones", "camellones.shp")
-line_layer_path = os.path.join(p, "outputs", "temp", "longest_line_output.shp")
-points_layer_path = os.path.join(p,  "outputs", "temp", "points_layer.shp")
-perpendicular_lines_path = os.path.join(p,  "outputs", "temp", "perpendicular_lines.shp")
+line_layer_path = os.path.join(p, "outputs", "temp", "longest_line_output.gpkg")
+points_layer_path = os.path.join(p,  "outputs", "temp", "points_layer.gpkg")
+perpendicular_lines_path = os.path.join(p,  "outputs", "temp", "perpendicular_lines.gpkg")
 
-# CSV path for output
+# CSV paths for output
 csv_widths_path = os.path.join(p, "outputs", "data", "output_widths.csv")
+csv_summary_path = os.path.join(p, "outputs", "data", "output_widths_summary.csv")
+csv_edt_error_path = os.path.join(p, "outputs", "data", "edt_width_error.csv")
+
+# Site parameters passed in by the batch runner (scripts/batch) override the defaults below
+site_params = globals().get("SITE_PARAMS", {})
+
+# Per-polygon summaries are always written; the station-level table (one row per 0.5 m station)
+# is optional, as downstream stages only need the per-polygon values
+write_station_widths = site_params.get("write_station_widths", True)
+
+# The perpendicular line of every station is only needed to QA individual polygons, and
+# 3-regenerate_perpendicular_lines_qgis.py rebuilds them on demand from the station table
+# (polygon_id, distance, angle, width), so writing them all here is off by default
+write_perpendicular_lines = site_params.get("write_perpendicular_lines", False)
+
+# Station sampling along the centre line:
+#   "dense"    - a station every station_spacing map units
+#   "adaptive" - stations on the same grid, refined per polygon only until its area converges
+# Either way the dense stations are written to points_layer, so the surviving height stage samples the
+# DEM evenly along each polygon whatever station_mode the widths used.
+station_mode = site_params.get("station_mode", "dense")
+station_spacing = site_params.get("station_spacing", 0.5)
+
+# Adaptive mode: every polygon starts with stations adaptive_max_spacing apart and the spacing is halved
+# until its integrated area changes by no more than adaptive_tolerance (relative) between two levels, or
+# the dense grid is reached
+adaptive_tolerance = site_params.get("adaptive_tolerance", 0.01)
+adaptive_max_spacing = 8.0               # spacing of the first refinement level
+adaptive_check_fraction = 0.05           # share of polygons also sampled densely to report the volume error
+
+# Width measurement at each station:
+#   "exact" - perpendicular ray clipped to the polygon (create_perpendicular_line_within_polygon)
+#   "edt"   - fast approximation: polygons are rasterized at edt_resolution and the width is read as
+#             twice the Euclidean distance to the polygon edge (needs station_mode = "dense")
+width_mode = site_params.get("width_mode", "exact")
+edt_resolution = site_params.get("edt_resolution", 0.25)
+edt_check_fraction = 0.05                # share of polygons also measured exactly, see edt_width_error.csv
+
+# Polygons are processed tile by tile so memory stays flat as the mapped area grows
+tile_size = site_params.get("tile_size", 1000.0)
+
+if station_mode not in ("dense", "adaptive"):
+    raise ValueError(f"Unknown station_mode: {station_mode}")
+if width_mode not in ("exact", "edt"):
+    raise ValueError(f"Unknown width_mode: {width_mode}")
+if width_mode == "edt" and station_mode != "dense":
+    raise ValueError('width_mode "edt" reads widths at the dense stations; set station_mode = "dense"')
+
+# Load layers (longest line along centre line, original polygons) with OGR, as Shapely geometries, so the
+# stage also runs without QGIS (run_stage.py --no-qgis)
+polygon_dataset, polygon_layer = open_layer(polygon_layer_path)
+line_dataset, line_layer = open_layer(line_layer_path)
+crs_wkt = layer_crs_wkt(polygon_layer)
+
+# The halo only has to reach the polygons a tile owns (the 1000 m perpendicular rays are clipped to their
+# own polygon); centre lines are then read over the owned polygons' extent alone
+halo_size = tile_halo(polygon_layer)
+
+
+def show_layer(path, name):
+    # Add a layer to the open project for visual inspection (only when run inside QGIS)
+    if "QgsProject" in globals():
+        QgsProject.instance().addMapLayer(QgsVectorLayer(path, name, "ogr"))
+
+
+# Dense stations of every centre line, read by the surviving height stage (in place of qgis:pointsalonglines)
+points_writer = GpkgWriter(
+    points_layer_path, layer_name_of(points_layer_path), ogr.wkbPoint, crs_wkt,
+    [("polygon_id", ogr.OFTInteger64), ("distance", ogr.OFTReal)],
+    index_fields=["polygon_id"],
+)
 
-# Load layers (longest line along centre line, original polygons)
-line_layer = QgsVectorLayer(line_layer_path, "Line Layer", "ogr")
-polygon_layer = QgsVectorLayer(polygon_layer_path, "Polygon Layer", "ogr")
-
-# Add layers for visual inspection
-QgsProject.instance().addMapLayer(line_layer)
-QgsProject.instance().addMapLayer(polygon_layer)
-
-# Generate points along the lines at 0.5 map unit intervals
-processing.run("qgis:pointsalonglines", {
-    "INPUT": line_layer,
-    "DISTANCE": 0.5,
-    "OUTPUT": points_layer_path
-})
-
-# Add point layer for visual inspection
-points_layer = QgsVectorLayer(points_layer_path, "Points Layer", "ogr")
-QgsProject.instance().addMapLayer(points_layer)
-
-# Define perpendicular lines layer schema (for immediate writing)
-perpendicular_lines_layer = QgsVectorLayer("LineString?crs=EPSG:3116", "Perpendicular Lines", "memory")
-perpendicular_lines_provider = perpendicular_lines_layer.dataProvider()
-perpendicular_lines_provider.addAttributes([QgsField("polygon_id", QVariant.Int), QgsField("distance", QVariant.Double), QgsField("width", QVariant.Double)])
-perpendicular_lines_layer.updateFields()
-
-# Open the shapefile to write directly
-writer = QgsVectorFileWriter(perpendicular_lines_path, "UTF-8", perpendicular_lines_provider.fields(), QgsWkbTypes.LineString, perpendicular_lines_layer.crs(), "ESRI Shapefile")
-
-def calculate_angle(segment_start, segment_end):
-    dx = segment_end.x() - segment_start.x()
-    dy = segment_end.y() - segment_start.y()
-    return math.atan2(dy, dx)
-
-def create_perpendicular_line_within_polygon(point, angle, polygon_geom):
-    perp_angle = angle + math.pi / 2
-    max_length = 1000
-
-    line_start = QgsPointXY(
-        point.x() + math.cos(perp_angle) * max_length,
-        point.y() + math.sin(perp_angle) * max_length
-    )
-    line_end = QgsPointXY(
-        point.x() - math.cos(perp_angle) * max_length,
-        point.y() - math.sin(perp_angle) * max_length
+writer = None
+if write_perpendicular_lines:
+    # Written in bulk with OGR: batched transactions, spatial and polygon_id indexes built once at the end
+    writer = GpkgWriter(
+        perpendicular_lines_path, layer_name_of(perpendicular_lines_path), ogr.wkbLineString, crs_wkt,
+        [("polygon_id", ogr.OFTInteger64), ("distance", ogr.OFTReal), ("width", ogr.OFTReal)],
+        index_fields=["polygon_id"],
     )
 
-    initial = QgsGeometry.fromPolylineXY([line_start, line_end])
-    intersect_geom = polygon_geom.intersection(initial)
 
-    if intersect_geom.isEmpty():
-        return QgsGeometry.fromPolylineXY([])
+def polygon_orientation(poly_geom):
+    # Typical (orientation) angle of a polygon: length-weighted axial circular mean of its centre line
+    angles = []
+    weights = []
 
-    if intersect_geom.isMultipart():
-        longest = max(
-            intersect_geom.asMultiPolyline(),
-            key=lambda ln: QgsGeometry.fromPolylineXY(ln).length()
-        )
-    else:
-        longest = intersect_geom.asPolyline()
-
-    return QgsGeometry.fromPolylineXY(longest)
+    for _, line_geom in iter_features(line_layer, poly_geom.bounds):
+        for line in getattr(line_geom, "geoms", [line_geom]):
+            coords = list(line.coords)
+            for seg_start, seg_end in zip(coords, coords[1:]):
+                seg_geom = LineString([seg_start, seg_end])
 
-# Collect typical (orientation) angles per polygon: length-weighted axial circular mean
-polygon_angles = {}
+                if not seg_geom.intersects(poly_geom):
+                    continue
 
-for poly_feature in polygon_layer.getFeatures():
-    poly_geom = poly_feature.geometry()
-    s = 0.0
-    c = 0.0
-    wsum = 0.0
+                angles.append(calculate_angle(seg_start, seg_end))  # radians
+                weights.append(seg_geom.length)  # weight by segment length
 
-    req = QgsFeatureRequest().setFilterRect(poly_geom.boundingBox())
-    for line_feature in line_layer.getFeatures(req):
-        line_geom = line_feature.geometry()
-        lines = line_geom.asMultiPolyline() if line_geom.isMultipart() else [line_geom.asPolyline()]
+    return axial_mean(angles, weights)
 
-        for line in lines:
-            for i in range(len(line) - 1):
-                seg_start = line[i]
-                seg_end = line[i + 1]
-                seg_geom = QgsGeometry.fromPolylineXY([seg_start, seg_end])
 
-                if not seg_geom.intersects(poly_geom):
-                    continue
+def tile_lines(owned, extent):
+    # Centre lines of the tile's own polygons, {polygon_id: line}; lines of neighbouring tiles' polygons
+    # that overlap the extent are skipped
+    lines = {}
+    for line_feature, line_geom in iter_features(line_layer, extent):
+        polygon_id_val = line_feature.GetField("polygon_id")
+        if polygon_id_val in owned:
+            lines[polygon_id_val] = line_geom
+    return lines
 
-                a = calculate_angle(QgsPointXY(seg_start), QgsPointXY(seg_end))  # radians
-                w = seg_geom.length()  # weight by segment length
 
-                # axial mean: use 2*a so a and a+pi are equivalent
-                s += w * math.sin(2 * a)
-                c += w * math.cos(2 * a)
-                wsum += w
+def grid_points(line_geom):
+    # Dense stations along a centre line: (grid index, point) every station_spacing from its start
+    n_steps = int(line_geom.length / station_spacing + 1e-9)
+    return [(i, line_geom.interpolate(i * station_spacing)) for i in range(n_steps + 1)]
 
-    if wsum > 0:
-        polygon_angles[poly_feature["polygon_id"]] = 0.5 * math.atan2(s, c)
 
-# Output rows: polygon_id, distance, width
-rows = []
+# Typical angles of the polygons in the current tile
+polygon_angles = {}
 
-for point_feature in points_layer.getFeatures():
-    pt = point_feature.geometry().asPoint()
+# Per-polygon running statistics for the current tile; written out and cleared after each tile,
+# since every polygon is processed entirely within the tile that owns it
+width_stats = {}
+
+summary_fp = open(csv_summary_path, "w", newline="")
+summary_writer = csv.writer(summary_fp)
+summary_writer.writerow([
+    "polygon_id", "n_stations", "length", "mean_width", "var_width", "min_width", "max_width",
+    "q25_width", "median_width", "q75_width", "area"
+])
+
+# Station rows (polygon_id, distance, width) are streamed straight to CSV when enabled
+station_fp = None
+station_writer = None
+if write_station_widths:
+    station_fp = open(csv_widths_path, "w", newline="")
+    station_writer = csv.writer(station_fp)
+    station_writer.writerow(["polygon_id", "distance", "angle", "width"])
+
+
+def measure_station(pt, poly_geom, polygon_id_val):
+    # Width of the polygon across its typical orientation at station point pt
+    perp = create_perpendicular_line_within_polygon((pt.x, pt.y), polygon_angles[polygon_id_val], poly_geom)
+    return perp, perp.length
+
+
+def record_station(polygon_id_val, distance, perp, width):
+    # perp is None for widths read from the distance transform, which have no line to write
+    if writer is not None and perp is not None:
+        writer.add(None if perp.is_empty else perp.wkb, [polygon_id_val, distance, width])
+
+    if polygon_id_val not in width_stats:
+        width_stats[polygon_id_val] = PolygonWidthStats()
+    width_stats[polygon_id_val].add(distance, width)
+
+    if station_writer is not None:
+        station_writer.writerow([polygon_id_val, distance, polygon_angles[polygon_id_val], width])
+
+
+def adaptive_stations(line_geom, poly_geom, inside, polygon_id_val):
+    """
+    Measure widths at a subset of the dense station grid (multiples of station_spacing).
+
+    Stations are measured on successively finer levels of the grid, starting adaptive_max_spacing apart
+    and halving the spacing each level; every level keeps the stations already measured. Refinement
+    stops once the integrated area of two consecutive levels differs by no more than adaptive_tolerance
+    relative to the finer one, or at the dense grid. Every polygon is refined this way, so each one's
+    area (and volume) has converged to within the tolerance between levels.
+
+    Returns {grid index: (point, perpendicular line, width)} for every station of the final level
+    inside the polygon.
+    """
+    n_steps = int(line_geom.length / station_spacing + 1e-9)
+    step = 1
+    while step * 2 <= max(1, int(adaptive_max_spacing / station_spacing)):
+        step *= 2
+    measured = {}
+
+    def level(step):
+        # Grid stations step apart, plus the last grid station so the whole centre line is covered
+        stations = {}
+        for i in sorted(set(range(0, n_steps + 1, step)) | {n_steps}):
+            if i not in measured:
+                pt = line_geom.interpolate(i * station_spacing)
+                measured[i] = None
+                if inside.contains(pt):
+                    measured[i] = (pt, *measure_station(pt, poly_geom, polygon_id_val))
+            if measured[i] is not None:
+                stations[i] = measured[i]
+        return stations
+
+    stations = level(step)
+    area = integrated_area(stations)
+    while step > 1:
+        step //= 2
+        stations, previous = level(step), area
+        area = integrated_area(stations)
+        # A zero area means the coarser levels missed the polygon's stations: keep refining
+        if area > 0 and abs(area - previous) <= adaptive_tolerance * area:
+            break
+    return stations
 
-    polygon_id_val = point_feature["polygon_id"]  # Get the polygon_id from the point feature
-    distance = point_feature["distance"]
 
-    # Loop through the polygons and check if the point lies within each polygon
-    for poly_feature in polygon_layer.getFeatures(
-        QgsFeatureRequest().setFilterRect(QgsGeometry.fromPointXY(pt).boundingBox())
-    ):
-        poly_geom = poly_feature.geometry()
+def dense_stations(points, poly_geom, inside, polygon_id_val):
+    # Every grid station inside the polygon, {grid index: (point, perpendicular line, width)}
+    return {
+        i: (pt, *measure_station(pt, poly_geom, polygon_id_val))
+        for i, pt in points if inside.contains(pt)
+    }
 
-        # Check if the point is inside the polygon and if the polygon_id matches
-        if poly_geom.contains(QgsGeometry.fromPointXY(pt)) and poly_feature["polygon_id"] == polygon_id_val:
-            # Access polygon_angles using polygon_id_val
-            if polygon_id_val in polygon_angles:
-                avg_angle = polygon_angles[polygon_id_val]
-                perp = create_perpendicular_line_within_polygon(pt, avg_angle, poly_geom)
-                width = perp.length() if not perp.isEmpty() else 0.0
 
-                # Create a feature for the perpendicular line
-                perpendicular_feature = QgsFeature()
-                perpendicular_feature.setGeometry(perp)
-                perpendicular_feature.setAttributes([polygon_id_val, distance, width])
+def integrated_area(stations):
+    # Same integration as PolygonWidthStats / 1-calculate_volumes.R
+    idx = sorted(stations)
+    return sum(stations[b][2] * (b - a) * station_spacing for a, b in zip(idx, idx[1:]))
+
+
+def measure_dense(polygon_id_val, points, poly_geom, inside):
+    # Stations ordered along the centre line; those outside the polygon are skipped
+    for i, pt in points:
+        if inside.contains(pt):
+            perp, width = measure_station(pt, poly_geom, polygon_id_val)
+            record_station(polygon_id_val, i * station_spacing, perp, width)
+
+
+adaptive_report = {"polygons": 0, "stations": 0, "checked": 0, "dense_stations": 0, "exceeded": 0, "max_error": 0.0}
+
+
+def measure_adaptive(polygon_id_val, line_geom, points, poly_geom, inside):
+    check_every = max(1, int(round(1 / adaptive_check_fraction))) if adaptive_check_fraction > 0 else 0
+
+    stations = adaptive_stations(line_geom, poly_geom, inside, polygon_id_val)
+    adaptive_report["stations"] += len(stations)
+
+    # Check the volume error against the dense result on a regular sample of polygons;
+    # any checked polygon found outside the tolerance keeps its dense stations instead
+    if check_every and adaptive_report["polygons"] % check_every == 0:
+        dense = dense_stations(points, poly_geom, inside, polygon_id_val)
+        adaptive_report["dense_stations"] += len(dense)
+        dense_area = integrated_area(dense)
+        if dense_area > 0:
+            error = abs(integrated_area(stations) - dense_area) / dense_area
+            adaptive_report["max_error"] = max(adaptive_report["max_error"], error)
+            adaptive_report["checked"] += 1
+            if error > adaptive_tolerance:
+                adaptive_report["exceeded"] += 1
+                stations = dense
+    adaptive_report["polygons"] += 1
+
+    for i in sorted(stations):
+        _, perp, width = stations[i]
+        record_station(polygon_id_val, i * station_spacing, perp, width)
+
+
+def rasterize_tile(owned):
+    """
+    Rasterize the polygons around the tile's own polygons at edt_resolution, burning polygon_id, and
+    take the Euclidean distance transform of each polygon's interior (pixels whose four neighbours
+    carry the same polygon_id). Returns (labels, distances in map units, x origin, y origin).
+    Touching polygons are burnt too, so the edge between two camellones counts as an edge of both.
+    """
+    margin = 2 * edt_resolution
+    xmin, ymin, xmax, ymax = owned_extent(owned)
+    xmin, ymin, xmax, ymax = xmin - margin, ymin - margin, xmax + margin, ymax + margin
+    cols = int(math.ceil((xmax - xmin) / edt_resolution))
+    rows = int(math.ceil((ymax - ymin) / edt_resolution))
+
+    raster = gdal.GetDriverByName("MEM").Create("", cols, rows, 1, gdal.GDT_Int32)
+    raster.SetGeoTransform((xmin, edt_resolution, 0, ymax, 0, -edt_resolution))
+    raster.GetRasterBand(1).Fill(-1)
+
+    # Only the polygons over the tile's footprint are burnt
+    polygon_layer.SetSpatialFilterRect(xmin, ymin, xmax, ymax)
+    gdal.RasterizeLayer(raster, [1], polygon_layer, options=["ATTRIBUTE=polygon_id"])
+    polygon_layer.SetSpatialFilter(None)
+    labels = raster.GetRasterBand(1).ReadAsArray()
+
+    padded = np.pad(labels, 1, constant_values=-1)
+    interior = labels >= 0
+    for dy, dx in ((0, 1), (2, 1), (1, 0), (1, 2)):
+        interior &= padded[dy:dy + rows, dx:dx + cols] == labels
+    distances = ndimage.distance_transform_edt(interior) * edt_resolution
+
+    return labels, distances, xmin, ymax
+
+
+# Exact vs distance-transform widths of the checked polygons in the current tile:
+# {polygon_id: (exact stats, edt stats, absolute error stats)}
+edt_checks = {}
+edt_report = {"polygons": 0, "stations": 0, "sum_abs_error": 0.0, "max_abs_error": 0.0, "max_area_error": 0.0}
+
+
+def measure_edt(polygon_id_val, points, poly_geom, edt_tile):
+    labels, distances, x0, y0 = edt_tile
+    check_every = max(1, int(round(1 / edt_check_fraction))) if edt_check_fraction > 0 else 0
+
+    for i, pt in points:
+        distance = i * station_spacing
+
+        # A station counts as inside its polygon when its pixel carries the polygon's id
+        col = int((pt.x - x0) / edt_resolution)
+        row = int((y0 - pt.y) / edt_resolution)
+        if not (0 <= row < labels.shape[0] and 0 <= col < labels.shape[1]) or labels[row, col] != polygon_id_val:
+            continue
+
+        # Distances run between pixel centres; the edge lies half a pixel beyond the edge pixel's centre
+        width = 2 * float(distances[row, col]) + edt_resolution
+        record_station(polygon_id_val, distance, None, width)
+
+        if check_every and int(polygon_id_val) % check_every == 0:
+            _, exact_width = measure_station(pt, poly_geom, polygon_id_val)
+            if polygon_id_val not in edt_checks:
+                edt_checks[polygon_id_val] = (PolygonWidthStats(), PolygonWidthStats(), PolygonWidthStats())
+            exact_stats, edt_stats, error_stats = edt_checks[polygon_id_val]
+            exact_stats.add(distance, exact_width)
+            edt_stats.add(distance, width)
+            error_stats.add(distance, abs(width - exact_width))
+
+
+if width_mode == "edt":
+    edt_error_fp = open(csv_edt_error_path, "w", newline="")
+    edt_error_writer = csv.writer(edt_error_fp)
+    edt_error_writer.writerow([
+        "polygon_id", "n_stations", "mean_width_exact", "mean_width_edt", "mean_abs_error", "max_abs_error",
+        "area_exact", "area_edt", "area_rel_error"
+    ])
+
+for core, halo in tiling.iter_tiles(layer_bounds(polygon_layer), tile_size, halo_size):
+    owned = owned_polygons(polygon_layer, core, halo)
+    if not owned:
+        continue
+    extent = owned_extent(owned)
+
+    polygon_angles = {}
+    for polygon_id_val, poly_geom in owned.items():
+        angle = polygon_orientation(poly_geom)
+        if angle is not None:
+            polygon_angles[polygon_id_val] = angle
+
+    edt_tile = rasterize_tile(owned) if width_mode == "edt" else None
+
+    for polygon_id_val, line_geom in sorted(tile_lines(owned, extent).items()):
+        points = grid_points(line_geom)
+        for i, pt in points:
+            points_writer.add(pt.wkb, [polygon_id_val, i * station_spacing])
+
+        if polygon_id_val not in polygon_angles:
+            print(f"Polygon ID {polygon_id_val} not found in polygon_angles")
+            continue
+
+        poly_geom = owned[polygon_id_val]
+        inside = prep(poly_geom)
+        if width_mode == "edt":
+            measure_edt(polygon_id_val, points, poly_geom, edt_tile)
+        elif station_mode == "dense":
+            measure_dense(polygon_id_val, points, poly_geom, inside)
+        else:
+            measure_adaptive(polygon_id_val, line_geom, points, poly_geom, inside)
+
+    for polygon_id_val, stats in width_stats.items():
+        summary_writer.writerow([polygon_id_val, *stats.row()])
+    width_stats.clear()
+
+    for polygon_id_val, (exact_stats, edt_stats, error_stats) in edt_checks.items():
+        area_error = abs(edt_stats.area - exact_stats.area) / exact_stats.area if exact_stats.area > 0 else float("nan")
+        edt_error_writer.writerow([
+            polygon_id_val, exact_stats.count, exact_stats.mean, edt_stats.mean, error_stats.mean, error_stats.max,
+            exact_stats.area, edt_stats.area, area_error
+        ])
+        edt_report["polygons"] += 1
+        edt_report["stations"] += error_stats.count
+        edt_report["sum_abs_error"] += error_stats.mean * error_stats.count
+        edt_report["max_abs_error"] = max(edt_report["max_abs_error"], error_stats.max)
+        if area_error == area_error:
+            edt_report["max_area_error"] = max(edt_report["max_area_error"], area_error)
+    edt_checks.clear()
+
+if station_mode == "adaptive":
+    print(f"Adaptive stations: {adaptive_report['stations']} measured")
+    if adaptive_report["checked"]:
+        print(
+            f"Checked {adaptive_report['checked']} polygons against dense sampling "
+            f"({adaptive_report['dense_stations']} stations): max relative volume error "
+            f"{adaptive_report['max_error']:.4f}, {adaptive_report['exceeded']} above tolerance "
+            "(replaced by dense stations)"
+        )
 
-                # Add the feature directly to the shapefile
-                writer.addFeature(perpendicular_feature)
+if width_mode == "edt":
+    edt_error_fp.close()
+    if edt_report["stations"]:
+        print(
+            f"Checked {edt_report['polygons']} polygons against exact widths ({edt_report['stations']} stations): "
+            f"mean absolute width error {edt_report['sum_abs_error'] / edt_report['stations']:.3f}, "
+            f"max {edt_report['max_abs_error']:.3f}, max relative area error {edt_report['max_area_error']:.4f} "
+            f"(per polygon: {csv_edt_error_path})"
+        )
 
-                rows.append([polygon_id_val, distance, width])  # Store data for CSV
-            else:
-                print(f"Polygon ID {polygon_id_val} not found in polygon_angles")
+points_writer.close()
+print(f"{points_writer.count} stations saved to {points_layer_path}")
 
-            break
+if writer is not None:
+    writer.close()
+    print(f"{writer.count} perpendicular lines saved to {perpendicular_lines_path}")
 
-# Close the writer to save the shapefile
-del writer
+if station_fp is not None:
+    station_fp.close()
+summary_fp.close()
 
-# Write widths CSV
-with open(csv_widths_path, "w", newline="") as fp:
-    w = csv.writer(fp)
-    w.writerow(["polygon_id", "distance", "width"])
-    w.writerows(rows)
+# Add layers for visual inspection
+show_layer(line_layer_path, "Line Layer")
+show_layer(polygon_layer_path, "Polygon Layer")
+show_layer(points_layer_path, "Points Layer")
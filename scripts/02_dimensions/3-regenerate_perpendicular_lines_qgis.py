@@ -0,0 +1,94 @@
+import os
+import sys
+import csv
+
+from osgeo import ogr
+
+from qgis.core import (
+    QgsVectorLayer,
+    QgsProject,
+    QgsRectangle,
+    QgsFeatureRequest,
+)
+
+# Rebuilds the perpendicular lines of 2-extract_dimensions_qgis.py for selected polygons only, for QA.
+# Uses the station table (output_widths.csv, needs write_station_widths = True) and the centre lines.
+
+# Get current project path
+p = os.path.dirname(QgsProject.instance().fileName())
+
+# Same perpendicular line construction as 2-extract_dimensions_qgis.py (mojana_fields package at the project root)
+if p not in sys.path:
+    sys.path.insert(0, p)
+from mojana_fields.gpkg import GpkgWriter, layer_name_of
+from mojana_fields.qgis_adapters import create_perpendicular_line_within_polygon
+
+# Paths
+polygon_layer_path = os.path.join(p, "spatial_data", "shapefiles", "camellones", "camellones.shp")
+line_layer_path = os.path.join(p, "outputs", "temp", "longest_line_output.gpkg")
+csv_widths_path = os.path.join(p, "outputs", "data", "output_widths.csv")
+perpendicular_lines_path = os.path.join(p, "outputs", "temp", "perpendicular_lines_qa.gpkg")
+
+# Polygons to inspect: a list of polygon_ids, and/or an extent (xmin, ymin, xmax, ymax) in layer units
+selected_polygon_ids = [1, 2, 3]
+selected_extent = None
+
+
+def regenerate_perpendicular_lines(polygon_ids=None, extent=None, output_path=perpendicular_lines_path):
+    """
+    Write the perpendicular line of every station of the chosen polygons (by polygon_id and/or
+    intersecting extent) to output_path, and return the written layer.
+    Each station point is recovered from its distance along the polygon's centre line, and the line is
+    rebuilt with the recorded angle, so the geometry matches what the width stage measured.
+    """
+    if not os.path.exists(csv_widths_path):
+        raise RuntimeError(
+            f"Station table not found: {csv_widths_path}\n"
+            "Run 2-extract_dimensions_qgis.py with write_station_widths = True first."
+        )
+
+    polygon_layer = QgsVectorLayer(polygon_layer_path, "Polygon Layer", "ogr")
+    line_layer = QgsVectorLayer(line_layer_path, "Line Layer", "ogr")
+
+    # Chosen polygons: {polygon_id: geometry}
+    wanted = set(polygon_ids or [])
+    polygons = {}
+    centre_lines = {}
+    if extent is not None:
+        for f in polygon_layer.getFeatures(QgsFeatureRequest().setFilterRect(QgsRectangle(*extent))):
+            wanted.add(f["polygon_id"])
+    if wanted:
+        ids = ", ".join(str(int(pid)) for pid in wanted)
+        for f in polygon_layer.getFeatures(QgsFeatureRequest().setFilterExpression(f'"polygon_id" IN ({ids})')):
+            polygons[f["polygon_id"]] = f.geometry()
+
+        # Centre lines of the chosen polygons only (polygon_id is indexed in the GeoPackage)
+        centre_lines = {
+            f["polygon_id"]: f.geometry()
+            for f in line_layer.getFeatures(QgsFeatureRequest().setFilterExpression(f'"polygon_id" IN ({ids})'))
+        }
+
+    # Same layer layout as the perpendicular lines of 2-extract_dimensions_qgis.py
+    fields = [("polygon_id", ogr.OFTInteger64), ("distance", ogr.OFTReal), ("width", ogr.OFTReal)]
+    with GpkgWriter(output_path, layer_name_of(output_path), ogr.wkbLineString, polygon_layer.crs().toWkt(),
+                    fields, index_fields=["polygon_id"]) as writer:
+        # Stream the station table, keeping only the chosen polygons' rows
+        with open(csv_widths_path, newline="") as fp:
+            for row in csv.DictReader(fp):
+                pid = int(row["polygon_id"])
+                if pid not in polygons or pid not in centre_lines:
+                    continue
+
+                distance = float(row["distance"])
+                pt = centre_lines[pid].interpolate(distance).asPoint()
+                perp = create_perpendicular_line_within_polygon(pt, float(row["angle"]), polygons[pid])
+                writer.add(bytes(perp.asWkb()), [pid, distance, float(row["width"])])
+
+    print(f"Regenerated {writer.count} perpendicular lines for {len(polygons)} polygons: {output_path}")
+
+    return QgsVectorLayer(output_path, "Perpendicular Lines (QA)", "ogr")
+
+
+# Add regenerated lines for visual inspection
+qa_layer = regenerate_perpendicular_lines(selected_polygon_ids, selected_extent)
+QgsProject.instance().addMapLayer(qa_layer)
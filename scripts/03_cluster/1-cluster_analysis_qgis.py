@@ -1,47 +1,55 @@
 import geopandas as gpd
 import pandas as pd
 import os
+import sys
+import json
+from datetime import datetime
 from sklearn.cluster import KMeans
 import numpy as np
-from shapely.geometry import LineString
-from math import atan2, degrees
 from sklearn.preprocessing import RobustScaler
 import networkx as nx
 
-# Helper function to calculate orientation of polygon longest axist
-def get_orientation(polygon):
-    if polygon is None or polygon.is_empty:
-        return np.nan
-    try:
-        mrr = polygon.minimum_rotated_rectangle
-        coords = list(mrr.exterior.coords)
-        edges = [LineString([coords[i], coords[i + 1]]) for i in range(4)]
-        lengths = [edge.length for edge in edges]
-        longest_edge = edges[np.argmax(lengths)]
-        dx = longest_edge.coords[1][0] - longest_edge.coords[0][0]
-        dy = longest_edge.coords[1][1] - longest_edge.coords[0][1]
-        angle_deg = degrees(atan2(dy, dx)) % 180
-        return angle_deg
-    except Exception:
-        return np.nan
+# Get current project path
+p = os.path.dirname(QgsProject.instance().fileName())
 
+# Orientation of the polygon's longest axis, shared via the mojana_fields package at the project root
+if p not in sys.path:
+    sys.path.insert(0, p)
+from mojana_fields.geometry import get_orientation
+from mojana_fields.gpkg import write_geodataframe
 
 # Paths
-p = os.path.dirname(QgsProject.instance().fileName())
 shapefile_path = os.path.join(p, "spatial_data", "shapefiles", "camellones", "camellones.shp")
 csv_widths_path = os.path.join(p, "outputs", "data", "output_widths.csv")
-output_path = os.path.join(p, "outputs", "final_shapefiles", "camellones_with_auto_clusters.shp")
+csv_summary_path = os.path.join(p, "outputs", "data", "output_widths_summary.csv")
+output_path = os.path.join(p, "outputs", "final_shapefiles", "camellones_with_auto_clusters.gpkg")
 csv_output_path = os.path.join(p, "outputs", "data", "camellones_with_auto_clusters.csv")
+model_dir = os.path.join(p, "outputs", "models")
+
+# Site parameters passed in by the batch runner (scripts/batch) override the defaults below
+site_params = globals().get("SITE_PARAMS", {})
+
+# The fitted scaler, centroids and label mapping are saved as versioned artefacts
+# (outputs/models/cluster_model_v<N>.json) and reused to classify new or edited polygons.
+# A full refit only happens when requested, when there is no saved model, or when the data
+# has drifted: mean squared distance to the nearest centroid, relative to the training data,
+# above drift_threshold.
+refit_cluster_model = site_params.get("refit_cluster_model", False)
+drift_threshold = site_params.get("drift_threshold", 1.5)
 
 # -Load data
 shapefile = gpd.read_file(shapefile_path)
-csv_widths_data = pd.read_csv(csv_widths_path)
 
-# Ensure the CSV contains polygon_id and distance columns
-max_distances = csv_widths_data.groupby('polygon_id')['distance'].max().reset_index()
+# Per-polygon max distance: read from the width summary if available, else from the station widths
+if os.path.exists(csv_summary_path):
+    summary_data = pd.read_csv(csv_summary_path)
+    max_distances = summary_data[['polygon_id', 'length']].rename(columns={'length': 'distance'})
+else:
+    csv_widths_data = pd.read_csv(csv_widths_path)
+    max_distances = csv_widths_data.groupby('polygon_id')['distance'].max().reset_index()
 
 # Subset shapefile to only include polygon_ids from the CSV
-polygon_ids_from_csv = csv_widths_data['polygon_id'].unique()
+polygon_ids_from_csv = max_distances['polygon_id'].unique()
 shapefile = shapefile[shapefile['polygon_id'].isin(polygon_ids_from_csv)]
 
 # Merge the max_distance into the shapefile
@@ -61,38 +69,106 @@ shapefile['angle_cos'] = np.cos(shapefile['angle_rad'])
 # Clustering features
 clustering_features = ['angle_sin', 'angle_cos', 'total_length']
 clustering_data = shapefile[clustering_features].dropna()
-scaler = RobustScaler()
-scaled_data = scaler.fit_transform(clustering_data)
-
-# Determine optimal K
-inertias = []
-K_range = range(1, min(15, len(scaled_data)))
-
-for k in K_range:
-    km = KMeans(n_clusters=k, random_state=15).fit(scaled_data)
-    inertias.append(km.inertia_)
-
-total_variance = inertias[0]
-explained = [1 - (i / total_variance) for i in inertias]
-
-for i in range(1, len(explained) - 1):
-    gain = explained[i] - explained[i - 1]
-    if gain < 0.10:
-        optimal_k = i + 1
-        break
 
-# Run clustering
-kmeans = KMeans(n_clusters=optimal_k, random_state=15)
-shapefile['cluster_id'] = kmeans.fit_predict(scaled_data)
 
-# Rename clusters based on descending average total_length
-avg_lengths = shapefile.groupby('cluster_id')['total_length'].mean()
-sorted_clusters = avg_lengths.sort_values(ascending=False).index.tolist()
-cluster_mapping = {old: new + 1 for new, old in enumerate(sorted_clusters)}
-shapefile['cluster_id'] = shapefile['cluster_id'].map(cluster_mapping)
+def fit_cluster_model(clustering_data):
+    """
+    Fit scaler + KMeans (K chosen by explained-variance gain) and return the model as a dict.
+    Clusters are numbered by descending average total_length.
+    """
+    scaler = RobustScaler()
+    scaled_data = scaler.fit_transform(clustering_data)
+
+    # Determine optimal K
+    inertias = []
+    K_range = range(1, min(15, len(scaled_data)))
+
+    for k in K_range:
+        km = KMeans(n_clusters=k, random_state=15).fit(scaled_data)
+        inertias.append(km.inertia_)
+
+    total_variance = inertias[0]
+    explained = [1 - (i / total_variance) for i in inertias]
+
+    for i in range(1, len(explained) - 1):
+        gain = explained[i] - explained[i - 1]
+        if gain < 0.10:
+            optimal_k = i + 1
+            break
+
+    # Run clustering
+    kmeans = KMeans(n_clusters=optimal_k, random_state=15)
+    labels = kmeans.fit_predict(scaled_data)
+
+    # Rename clusters based on descending average total_length
+    avg_lengths = pd.Series(clustering_data['total_length'].values).groupby(labels).mean()
+    sorted_clusters = avg_lengths.sort_values(ascending=False).index.tolist()
+    cluster_mapping = {int(old): new + 1 for new, old in enumerate(sorted_clusters)}
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "features": clustering_features,
+        "scaler_center": scaler.center_.tolist(),
+        "scaler_scale": scaler.scale_.tolist(),
+        "centroids": kmeans.cluster_centers_.tolist(),
+        "cluster_mapping": cluster_mapping,
+        "n_training": int(len(scaled_data)),
+        "mean_sq_distance": float(kmeans.inertia_ / len(scaled_data)),
+    }
+
+
+def nearest_centroid(model, clustering_data):
+    # Raw KMeans labels (as KMeans.predict) and squared distance to the nearest centroid
+    scaled = (clustering_data[model["features"]].values - np.array(model["scaler_center"])) / np.array(model["scaler_scale"])
+    d2 = ((scaled[:, None, :] - np.array(model["centroids"])[None, :, :]) ** 2).sum(axis=2)
+    return d2.argmin(axis=1), d2.min(axis=1)
+
+
+def load_latest_model():
+    versions = []
+    if os.path.isdir(model_dir):
+        for fname in os.listdir(model_dir):
+            if fname.startswith("cluster_model_v") and fname.endswith(".json"):
+                versions.append(int(fname[len("cluster_model_v"):-len(".json")]))
+    if not versions:
+        return None
+    with open(os.path.join(model_dir, f"cluster_model_v{max(versions)}.json")) as fp:
+        model = json.load(fp)
+    model["cluster_mapping"] = {int(k): v for k, v in model["cluster_mapping"].items()}
+    return model
+
+
+def save_model(model):
+    os.makedirs(model_dir, exist_ok=True)
+    previous = load_latest_model()
+    model["version"] = previous["version"] + 1 if previous else 1
+    path = os.path.join(model_dir, f"cluster_model_v{model['version']}.json")
+    with open(path, "w") as fp:
+        json.dump(model, fp, indent=2)
+    print(f"Cluster model v{model['version']} saved to: {path}")
+
+
+# Reuse the saved model unless a refit is requested or needed
+model = None if refit_cluster_model else load_latest_model()
+if model is not None:
+    _, d2 = nearest_centroid(model, clustering_data)
+    # A model whose training points all sat on their centroids has no baseline to compare against: refit
+    baseline = model["mean_sq_distance"]
+    drift = float(d2.mean()) / baseline if baseline > 0 else float("inf")
+    print(f"Cluster model v{model['version']}: drift statistic {drift:.2f} (threshold {drift_threshold})")
+    if drift > drift_threshold:
+        model = None
+
+if model is None:
+    model = fit_cluster_model(clustering_data)
+    save_model(model)
+
+# Assign cluster ids with the (saved or new) model, without refitting
+labels, _ = nearest_centroid(model, clustering_data)
+shapefile['cluster_id'] = pd.Series([model["cluster_mapping"][int(l)] for l in labels], index=clustering_data.index)
 
 # Save results
-shapefile.to_file(output_path)
+write_geodataframe(shapefile, output_path, index_fields=["polygon_id"])
 
 shapefile_csv = shapefile.copy()
 shapefile_csv['geometry'] = shapefile_csv['geometry'].apply(lambda geom: geom.wkt)
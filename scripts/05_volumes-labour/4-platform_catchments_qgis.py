@@ -0,0 +1,96 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+# Assigns every camellon to its nearest platform (optionally within a maximum distance) and totals field
+# volume and labour per platform, so labour can be set against the population living next to the fields
+# rather than the whole site's population (as in 2-labour_cluster_summaries.R).
+
+# Get current project path (the batch runner passes it as PROJECT_DIR and does not start QGIS)
+p = globals().get("PROJECT_DIR") or os.path.dirname(QgsProject.instance().fileName())
+
+# Catchment helpers from the mojana_fields package at the project root
+if p not in sys.path:
+    sys.path.insert(0, p)
+from mojana_fields.catchment import assign_nearest, boundary_vertices, catchment_totals
+
+# Paths
+camellones_path = os.path.join(p, "spatial_data", "shapefiles", "camellones", "camellones.shp")
+volume_results_path = os.path.join(p, "outputs", "data", "volume_results.csv")
+platforms_pop_path = os.path.join(p, "outputs", "final_shapefiles", "platforms_houses_pop.gpkg")
+camellones_output_path = os.path.join(p, "outputs", "data", "camellones_catchments.csv")
+platforms_output_path = os.path.join(p, "outputs", "data", "platform_catchments.csv")
+
+# Site parameters passed in by the batch runner (scripts/batch) override the defaults below
+site_params = globals().get("SITE_PARAMS", {})
+
+# Camellones further than this (map units) from every platform stay unassigned; None = no limit
+max_distance = site_params.get("catchment_max_distance", None)
+
+# Platform boundaries are densified to vertices this far apart (distances are exact to half of it)
+densify_step = site_params.get("catchment_densify_step", 5.0)
+
+# Labour as in 2-labour_cluster_summaries.R: 2.5-5 m3 moved per person-day,
+# community = person-days / pop / 2 (here the platform's own population)
+m3_per_person_day_min, m3_per_person_day_max = 2.5, 5.0
+community_factor = 2
+
+
+# -Load data
+camellones = gpd.read_file(camellones_path)[["polygon_id", "geometry"]]
+volumes = pd.read_csv(volume_results_path)[["polygon_id", "total_volume"]]
+camellones = camellones.merge(volumes, on="polygon_id", how="inner")
+camellones = camellones[camellones["total_volume"].notna()].reset_index(drop=True)
+
+platforms = gpd.read_file(platforms_pop_path)
+if camellones.crs != platforms.crs:
+    camellones = camellones.to_crs(platforms.crs)
+platform_ids = platforms["id"].to_numpy() if "id" in platforms.columns else platforms.index.to_numpy()
+
+# -Nearest platform of each camellon (from its centroid)
+vertices, owners = boundary_vertices(platforms.geometry, densify_step)
+centroids = camellones.geometry.centroid
+owner, distance = assign_nearest(np.column_stack([centroids.x, centroids.y]), vertices, owners, max_distance)
+
+assigned = owner >= 0
+camellones["platform_id"] = pd.Series(platform_ids[np.maximum(owner, 0)], dtype="Int64").where(assigned)
+camellones["distance"] = np.where(assigned, distance, np.nan)
+
+camellones[["polygon_id", "platform_id", "distance", "total_volume"]].to_csv(camellones_output_path, index=False)
+
+# -Per-platform totals
+n_platforms = len(platforms)
+catchment_volume = catchment_totals(owner, camellones["total_volume"], n_platforms)
+n_camellones = np.bincount(owner[assigned], minlength=n_platforms)
+
+person_days_min = catchment_volume / m3_per_person_day_max
+person_days_max = catchment_volume / m3_per_person_day_min
+pop = platforms["pop"].to_numpy(dtype=float)
+
+# Per-capita values are undefined for platforms with no estimated population
+with np.errstate(divide="ignore", invalid="ignore"):
+    volume_per_capita = np.where(pop > 0, catchment_volume / pop, np.nan)
+    community_days_min = np.where(pop > 0, person_days_min / (pop * community_factor), np.nan)
+    community_days_max = np.where(pop > 0, person_days_max / (pop * community_factor), np.nan)
+
+summary = pd.DataFrame({
+    "platform_id": platform_ids,
+    "houses": platforms["houses"].to_numpy(),
+    "pop": platforms["pop"].to_numpy(),
+    "n_camellones": n_camellones,
+    "total_volume": catchment_volume,
+    "volume_per_capita": volume_per_capita,
+    "person_days_min": person_days_min,
+    "person_days_max": person_days_max,
+    "community_days_min": community_days_min,
+    "community_days_max": community_days_max,
+})
+summary.to_csv(platforms_output_path, index=False)
+
+print(f"Assigned {int(assigned.sum())} of {len(camellones)} camellones to {int((n_camellones > 0).sum())} platforms")
+if not assigned.all():
+    print(f"Unassigned (beyond {max_distance} m): {int((~assigned).sum())} camellones, "
+          f"{camellones.loc[~assigned, 'total_volume'].sum():.0f} m3")
+print(f"Results saved to {camellones_output_path} and {platforms_output_path}")
@@ -0,0 +1,206 @@
+import os
+import sys
+import time
+import warnings
+import numpy as np
+import pandas as pd
+
+# Bootstrap confidence intervals for the point estimates of the pipeline: the volume of every camellon
+# (from its station widths, as in 1-calculate_volumes.R), its surviving height (from the station DEM samples
+# of S2_surviving_height) and the cluster labour totals of 2-labour_cluster_summaries.R.
+# Every replicate redraws the stations of each polygon with replacement; all polygons are resampled together
+# (mojana_fields.stats.bootstrap_group_sums), so the run takes seconds rather than one pass per replicate.
+# Stations are treated as independent, which ignores the correlation between neighbouring widths: the
+# intervals describe sampling noise along each polygon, not error in the polygon outlines.
+
+# Get current project path (the batch runner passes it as PROJECT_DIR and does not start QGIS)
+p = globals().get("PROJECT_DIR") or os.path.dirname(QgsProject.instance().fileName())
+
+# Resampling helper from the mojana_fields package at the project root
+if p not in sys.path:
+    sys.path.insert(0, p)
+from mojana_fields.stats import bootstrap_group_sums
+
+# Paths
+widths_path = os.path.join(p, "outputs", "data", "output_widths.csv")
+elevations_path = os.path.join(p, "outputs", "data", "station_elevations.csv")
+clusters_path = os.path.join(p, "outputs", "data", "camellones_with_auto_clusters.csv")
+population_path = os.path.join(p, "outputs", "data", "platforms_houses_pop.csv")
+polygons_output_path = os.path.join(p, "outputs", "data", "polygon_bootstrap_ci.csv")
+clusters_output_path = os.path.join(p, "outputs", "data", "cluster_labour_bootstrap_ci.csv")
+
+# Site parameters passed in by the batch runner (scripts/batch) override the defaults below
+site_params = globals().get("SITE_PARAMS", {})
+n_replicates = site_params.get("bootstrap_replicates", 1000)
+confidence = site_params.get("bootstrap_confidence", 0.95)
+seed = site_params.get("bootstrap_seed", 0)
+
+# Polygons are resampled this many at a time, which bounds the size of the replicate arrays
+block_polygons = 2000
+
+# As in 1-calculate_volumes.R: volume = 2/3 * height * sum(width * length), height fixed at 1.4 / 2 m
+volume_factor = (2 / 3) * (1.4 / 2)
+
+# As in 2-labour_cluster_summaries.R: 2.5-5 m3 moved per person-day; family = person-days / 5,
+# community = person-days / sum(pop) / 2
+m3_per_person_day_min, m3_per_person_day_max = 2.5, 5.0
+family_size = 5
+community_factor = 2
+
+rng = np.random.default_rng(seed)
+alpha = (1 - confidence) / 2
+started = time.time()
+
+
+def group_starts(ids):
+    # First row of every run of equal ids (ids sorted)
+    ids = np.asarray(ids)
+    return np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+
+
+def interval(replicates):
+    # Percentile interval over the replicate axis (axis 1); NaN replicates are left out, all-NaN gives NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        lo, hi = np.nanquantile(replicates, [alpha, 1 - alpha], axis=1)
+    return lo, hi
+
+
+def bootstrap_blocks(values, starts, statistic):
+    """
+    Apply statistic to the bootstrap sums (n_polygons x n_replicates [x k]) of block_polygons polygons at a
+    time and yield its results, so only one block of replicates is held in memory.
+    """
+    ends = np.append(starts[1:], len(values))
+    for i0 in range(0, len(starts), block_polygons):
+        i1 = min(i0 + block_polygons, len(starts))
+        rows = slice(starts[i0], ends[i1 - 1])
+        yield statistic(bootstrap_group_sums(values[rows], starts[i0:i1] - starts[i0], n_replicates, rng))
+
+
+# ----------------------------
+# Volumes (station widths)
+# ----------------------------
+if not os.path.isfile(widths_path):
+    raise RuntimeError(f"Station widths not found: {widths_path} (run 2-extract_dimensions_qgis.py "
+                       "with write_station_widths enabled)")
+
+widths = pd.read_csv(widths_path, usecols=["polygon_id", "distance", "width"])
+widths = widths.sort_values(["polygon_id", "distance"], kind="mergesort")
+
+# Segment areas as in 1-calculate_volumes.R: each width times the distance back to the previous station
+gap = widths.groupby("polygon_id")["distance"].diff()
+segments = widths.assign(area=(widths["width"] * gap).fillna(0.0))[gap.notna()]
+
+segment_ids = segments["polygon_id"].to_numpy()
+starts = group_starts(segment_ids)
+volume_ids = segment_ids[starts]
+areas = segments["area"].to_numpy()
+
+volume = volume_factor * np.add.reduceat(areas, starts)
+volume_replicates = volume_factor * np.concatenate(list(bootstrap_blocks(areas, starts, lambda sums: sums)))
+
+# Polygons with a single station have no segment: zero volume, as in 1-calculate_volumes.R
+single = np.setdiff1d(widths["polygon_id"].unique(), volume_ids)
+volume_ids = np.append(volume_ids, single)
+volume = np.append(volume, np.zeros(len(single)))
+volume_replicates = np.vstack([volume_replicates, np.zeros((len(single), n_replicates))])
+
+volume_lo, volume_hi = interval(volume_replicates)
+polygons = pd.DataFrame({
+    "polygon_id": volume_ids,
+    "total_volume": volume,
+    "volume_lo": volume_lo,
+    "volume_hi": volume_hi,
+})
+
+print(f"Volumes: {len(polygons)} polygons, {len(areas)} segments")
+
+
+# ----------------------------
+# Surviving heights (station DEM samples)
+# ----------------------------
+height_columns = ["avg_elev", "avg_min_elev", "avg_max_elev"]
+
+
+def height_means(sums):
+    # Means of the non-zero samples, as in S2_surviving_height: [..., :3] are sums, [..., 3:] the count
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return sums[..., :3] / sums[..., 3:]
+
+
+if os.path.isfile(elevations_path):
+    stations = pd.read_csv(elevations_path).sort_values("polygon_id", kind="mergesort")
+    samples = stations[["elev", "min_elev", "max_elev"]].to_numpy(dtype=float)
+
+    # sample_window falls back to the point elevation for min / max, so the three are zero together
+    # and one count of non-zero stations serves all three means
+    values = np.column_stack([samples, samples[:, 0] != 0])
+
+    starts = group_starts(stations["polygon_id"].to_numpy())
+    heights = pd.DataFrame({"polygon_id": stations["polygon_id"].to_numpy()[starts]})
+    point = height_means(np.add.reduceat(values, starts, axis=0))
+
+    bounds = []
+    for means in bootstrap_blocks(values, starts, height_means):
+        # Surviving height: mean window maximum above mean window minimum
+        stats = np.concatenate([means, means[..., 2:3] - means[..., 1:2]], axis=2)
+        lo, hi = interval(stats)
+        bounds.append(np.column_stack([lo, hi]))
+    bounds = np.concatenate(bounds)
+
+    point = np.column_stack([point, point[:, 2] - point[:, 1]])
+    for k, name in enumerate(height_columns + ["surviving_height"]):
+        heights[name] = point[:, k]
+        heights[f"{name}_lo"] = bounds[:, k]
+        heights[f"{name}_hi"] = bounds[:, k + 4]
+
+    polygons = polygons.merge(heights, on="polygon_id", how="outer")
+    print(f"Surviving heights: {len(heights)} polygons, {len(stations)} stations")
+else:
+    print(f"Station elevations not found: {elevations_path} (surviving height intervals skipped)")
+
+polygons.sort_values("polygon_id").to_csv(polygons_output_path, index=False)
+
+
+# ----------------------------
+# Cluster labour totals (2-labour_cluster_summaries.R)
+# ----------------------------
+clusters = pd.read_csv(clusters_path, usecols=["polygon_id", "cluster_id"]).dropna()
+pop_total = pd.read_csv(population_path)["pop"].sum()
+
+# Replicate rows of the polygons that have a cluster, ordered by cluster
+volume_row = pd.Series(np.arange(len(volume_ids)), index=volume_ids)
+combined = clusters[clusters["polygon_id"].isin(volume_ids)].sort_values("cluster_id", kind="mergesort")
+cluster_ids = combined["cluster_id"].astype(int).to_numpy()
+combined_rows = volume_row[combined["polygon_id"]].to_numpy()
+replicates = volume_replicates[combined_rows]
+points = volume[combined_rows]
+
+starts = group_starts(cluster_ids)
+totals = {
+    "camellon_type": [str(c) for c in cluster_ids[starts]] + ["Total"],
+    "quantity": list(np.diff(np.append(starts, len(cluster_ids)))) + [len(cluster_ids)],
+}
+total_volume = np.append(np.add.reduceat(points, starts), points.sum())
+total_replicates = np.vstack([np.add.reduceat(replicates, starts, axis=0), replicates.sum(axis=0)])
+total_lo, total_hi = interval(total_replicates)
+
+totals["total_volume"] = total_volume
+totals["volume_lo"] = total_lo
+totals["volume_hi"] = total_hi
+
+# Person, family and community days at the fast (min) and slow (max) rate, with the divisors of
+# 2-labour_cluster_summaries.R
+for label, rate in (("min", m3_per_person_day_max), ("max", m3_per_person_day_min)):
+    for unit, divisor in (("person_days", 1.0), ("family_days", family_size),
+                          ("community_days", pop_total * community_factor)):
+        scale = 1.0 / (rate * divisor) if divisor > 0 else np.nan
+        totals[f"{unit}_{label}"] = total_volume * scale
+        totals[f"{unit}_{label}_lo"] = total_lo * scale
+        totals[f"{unit}_{label}_hi"] = total_hi * scale
+
+pd.DataFrame(totals).to_csv(clusters_output_path, index=False)
+
+print(f"{n_replicates} replicates, {confidence:.0%} intervals, in {time.time() - started:.1f} s")
+print(f"Results saved to {polygons_output_path} and {clusters_output_path}")
@@ -0,0 +1,265 @@
+import os
+import sys
+import csv
+import numpy as np
+from osgeo import gdal, ogr
+
+from qgis.core import (
+    QgsProject,
+    QgsVectorLayer,
+    QgsFeatureRequest
+)
+
+
+# ----------------------------
+# Paths (relative to project)
+# ----------------------------
+project_path = os.path.dirname(QgsProject.instance().fileName())
+
+# Shared helpers from the mojana_fields package at the project root
+if project_path not in sys.path:
+    sys.path.insert(0, project_path)
+from mojana_fields.raster import block_window, mask_block, pixel_of, rasterize_mask, sample_window
+from mojana_fields.gpkg import GpkgWriter, layer_name_of
+from mojana_fields.qgis_adapters import (
+    iter_tiles, ogr_fields, ogr_value, owned_extent, owned_polygons, rect_bounds, tile_halo
+)
+
+polygon_layer_path = os.path.join(project_path, "spatial_data", "shapefiles", "camellones", "camellones.shp")
+points_layer_path  = os.path.join(project_path, "outputs", "temp", "points_layer.gpkg")
+dem_raster_path = os.path.join(project_path, "spatial_data", "DEM", "DEM_fondodeadaptacion.tif")
+water_bodies_path = os.path.join(project_path, "spatial_data", "shapefiles", "water_bodies", "ancient_courses.shp")
+
+csv_output_path = os.path.join(project_path, "outputs", "data", "surviving_heights.csv")
+csv_stations_path = os.path.join(project_path, "outputs", "data", "station_elevations.csv")
+gpkg_output_path = os.path.join(project_path, "outputs", "final_shapefiles", "camellones_surviving_heights.gpkg")
+
+# Ensure output directories exist
+os.makedirs(os.path.dirname(csv_output_path), exist_ok=True)
+os.makedirs(os.path.dirname(gpkg_output_path), exist_ok=True)
+
+# Site parameters passed in by the batch runner (scripts/batch) override the defaults below
+site_params = globals().get("SITE_PARAMS", {})
+
+# Polygons are processed tile by tile, reading only the tile's points and DEM cells, so memory stays
+# flat as the mapped area grows
+tile_size = site_params.get("tile_size", 1000.0)
+
+# Water is masked out of the DEM as each block is read (no masked copy of the DEM is written):
+#   "threshold" - cells below water_threshold are water
+#   "polygons"  - cells inside the water_bodies polygons are water
+#   "none"      - no masking
+water_mask_mode = site_params.get("water_mask_mode", "threshold")
+water_threshold = site_params.get("water_threshold", 19.95)
+
+# One row per station (polygon_id, elev, min_elev, max_elev), resampled by
+# 05_volumes-labour/5-bootstrap_confidence_intervals_qgis.py; the per-polygon averages never need it
+write_station_elevations = site_params.get("write_station_elevations", True)
+
+
+# ----------------------------
+# Load DEM
+# ----------------------------
+dem_dataset = gdal.Open(dem_raster_path)
+if not dem_dataset:
+    raise RuntimeError(f"Failed to open DEM raster: {dem_raster_path}")
+
+gt = dem_dataset.GetGeoTransform()
+raster_band = dem_dataset.GetRasterBand(1)
+source_no_data_value = raster_band.GetNoDataValue()
+print("DEM raster loaded successfully.")
+
+# Water and the DEM's own NoData cells both read as this value
+no_data_value = -9999
+
+water_layer = None
+if water_mask_mode == "polygons":
+    water_dataset = ogr.Open(water_bodies_path)
+    if not water_dataset:
+        raise RuntimeError(f"Failed to open water bodies layer: {water_bodies_path}")
+    water_layer = water_dataset.GetLayer()
+elif water_mask_mode not in ("threshold", "none"):
+    raise ValueError(f"Unknown water_mask_mode: {water_mask_mode}")
+
+# 4m window around pixel (assumes square pixels; see note below if not)
+buffer_px = int(4 / abs(gt[1]))
+
+
+# ----------------------------
+# Load layers
+# ----------------------------
+polygon_layer = QgsVectorLayer(polygon_layer_path, "Polygon Layer", "ogr")
+if not polygon_layer.isValid():
+    raise RuntimeError(f"Failed to load polygon layer: {polygon_layer_path}")
+QgsProject.instance().addMapLayer(polygon_layer)
+print("Polygon layer loaded successfully.")
+
+# The halo only has to reach the polygons a tile owns; points and DEM cells (with the 4 m window margin)
+# are read over the owned polygons' extent
+halo_size = tile_halo(polygon_layer)
+
+points_layer = QgsVectorLayer(points_layer_path, "Points Layer", "ogr")
+if not points_layer.isValid():
+    raise RuntimeError(f"Failed to load points layer: {points_layer_path}")
+QgsProject.instance().addMapLayer(points_layer)
+print("Points layer loaded successfully.")
+
+
+# ----------------------------
+# Stream points tile by tile
+# ----------------------------
+if "polygon_id" not in [f.name() for f in polygon_layer.fields()]:
+    raise RuntimeError("Polygon layer is missing required field: polygon_id")
+
+# Validate points field exists
+if "polygon_id" not in [f.name() for f in points_layer.fields()]:
+    raise RuntimeError("Points layer is missing required field: polygon_id")
+
+
+def water_mask(block, xoff, yoff):
+    # Boolean array marking the water cells of a DEM block
+    if water_mask_mode == "threshold":
+        return block < water_threshold
+    if water_mask_mode == "polygons":
+        # Water polygons over the block's footprint, burnt into an in-memory raster
+        return rasterize_mask(water_layer, gt, xoff, yoff, block.shape, dem_dataset.GetProjection())
+    return np.zeros(block.shape, dtype=bool)
+
+
+def read_dem_block(rect):
+    """
+    Read, in one call, every DEM cell a point inside rect can need: the pixels covering rect plus the
+    buffer_px window margin, clipped to the raster. Water and NoData cells are set to no_data_value.
+    Returns (array, column offset, row offset).
+    """
+    xoff, yoff, cols, rows = block_window(gt, raster_band.XSize, raster_band.YSize, rect_bounds(rect), buffer_px)
+    block = raster_band.ReadAsArray(xoff, yoff, cols, rows)
+    block = mask_block(block, water_mask(block, xoff, yoff), source_no_data_value, no_data_value)
+    return block, xoff, yoff
+
+
+def tiles():
+    """
+    Yield (owned polygons, their extent, DEM block) for every tile. Each tile reads its polygons and the
+    DEM block under them once; its points are then read through the GeoPackage spatial index.
+    """
+    for core, halo in iter_tiles(polygon_layer.extent(), tile_size, halo_size):
+        owned = owned_polygons(polygon_layer, core, halo)
+        if not owned:
+            continue
+
+        extent = owned_extent(owned)
+        yield owned, extent, read_dem_block(extent)
+
+
+def polygon_averages(data):
+    # Zeros were never accumulated, so these are the means of the non-zero values
+    return [total / count if count else 0.0 for total, count in data]
+
+
+# ----------------------------
+# Accumulate elevations per polygon_id, tile by tile
+# ----------------------------
+# Every polygon is processed entirely within the tile that owns it, so its averages are written to
+# surviving_heights.csv after the tile and the running sums cleared
+polygon_data = {}  # polygon_id -> running [sum, count] per elevation type (current tile only)
+
+averages_fp = open(csv_output_path, "w", newline="")
+averages_writer = csv.writer(averages_fp)
+averages_writer.writerow(["polygon_id", "avg_elev", "avg_min_elev", "avg_max_elev"])
+
+# Station rows are streamed straight to CSV when enabled
+station_fp = None
+if write_station_elevations:
+    station_fp = open(csv_stations_path, "w", newline="")
+    station_writer = csv.writer(station_fp)
+    station_writer.writerow(["polygon_id", "elev", "min_elev", "max_elev"])
+
+n_polygons = 0
+for owned, extent, (dem_block, xoff, yoff) in tiles():
+    for pt_feat in points_layer.getFeatures(QgsFeatureRequest().setFilterRect(extent)):
+        # Points of polygons owned by neighbouring tiles are skipped
+        pid = pt_feat["polygon_id"]
+        poly_geom = owned.get(pid)
+
+        pt_geom = pt_feat.geometry()
+        if pt_geom is None or pt_geom.isEmpty():
+            continue
+
+        point = pt_geom.asPoint()
+
+        # Optional safety check: ensure point is inside its referenced polygon
+        if not poly_geom or not poly_geom.contains(pt_geom):
+            continue
+
+        # ----------------------------
+        # DEM sampling (ALWAYS compute a 4m window)
+        # ----------------------------
+        px, py = pixel_of(gt, point.x(), point.y(), raster_band.XSize, raster_band.YSize)
+
+        # Point elevation and min / max over the 4m window around its pixel (from the tile's DEM block)
+        elev, min_elev, max_elev = sample_window(dem_block, py - yoff, px - xoff, buffer_px, no_data_value)
+
+        if station_fp:
+            station_writer.writerow([pid, elev, min_elev, max_elev])
+
+        # Accumulate (elevation, min, max)
+        if pid not in polygon_data:
+            polygon_data[pid] = [[0.0, 0], [0.0, 0], [0.0, 0]]
+
+        for running, value in zip(polygon_data[pid], (elev, min_elev, max_elev)):
+            if value != 0:
+                running[0] += value
+                running[1] += 1
+
+    for pid, data in polygon_data.items():
+        averages_writer.writerow([pid, *polygon_averages(data)])
+    n_polygons += len(polygon_data)
+    polygon_data.clear()
+
+averages_fp.close()
+print(f"Attributes of {n_polygons} polygons saved to {csv_output_path}")
+
+if station_fp:
+    station_fp.close()
+    print(f"Station elevations saved to {csv_stations_path}")
+
+
+# ----------------------------
+# Write output polygon layer (copy original fields + add new)
+# ----------------------------
+# Written in bulk with OGR: batched transactions, spatial index built once at the end
+new_names = ["avg_elev", "avg_min_elev", "avg_max_elev"]
+kept, fields = ogr_fields(polygon_layer.fields(), drop=new_names)
+fields += [(name, ogr.OFTReal) for name in new_names]
+
+# Averages read back from surviving_heights.csv as one array sorted by polygon_id (four floats per
+# polygon); polygons without stations get zeros, as before
+averages = np.loadtxt(csv_output_path, delimiter=",", skiprows=1, ndmin=2).reshape(-1, 4)
+averages = averages[np.argsort(averages[:, 0], kind="stable")]
+average_ids = averages[:, 0]
+no_average = [0.0] * len(new_names)
+
+with GpkgWriter(gpkg_output_path, layer_name_of(gpkg_output_path), ogr.wkbMultiPolygon,
+                polygon_layer.crs().toWkt(), fields, index_fields=["polygon_id"]) as writer:
+    for f in polygon_layer.getFeatures():
+        row = np.searchsorted(average_ids, f["polygon_id"])
+        found = row < len(average_ids) and average_ids[row] == f["polygon_id"]
+        avg = averages[row, 1:].tolist() if found else no_average
+        attributes = f.attributes()
+        geom = ogr.ForceToMultiPolygon(ogr.CreateGeometryFromWkb(bytes(f.geometry().asWkb())))
+        writer.add(geom, [ogr_value(attributes[i]) for i in kept] + avg)
+
+print(f"{writer.count} polygons saved to {gpkg_output_path}")
+QgsProject.instance().addMapLayer(QgsVectorLayer(gpkg_output_path, "camellones_surviving_heights", "ogr"))
+
+
+"""
+NOTE (pixel size):
+If your DEM pixels are not square, replace:
+    buffer_px = int(4 / abs(gt[1]))
+with:
+    buffer_px_x = int(4 / abs(gt[1]))
+    buffer_px_y = int(4 / abs(gt[5]))
+and pass a (columns, rows) margin through read_dem_block and sample_window (mojana_fields/raster.py).
+"""
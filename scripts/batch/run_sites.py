@@ -0,0 +1,302 @@
+"""
+Batch front end: run the pipeline for many sites on one machine.
+
+Run from a terminal with the Python that ships with QGIS (not from the QGIS Python Console):
+    python scripts/batch/run_sites.py scripts/batch/sites_example.json --jobs 4
+
+Each site in the manifest gets its own directory under output_root, laid out like this repository
+(spatial_data/..., outputs/...), with its camellones, platforms, DEM and (optional) water bodies linked
+in. Every stage runs in its own process (run_stage.py for Python, Rscript for R) from a pool of --jobs
+workers, as soon as the stages it depends on have finished for that site. Each stage is retried up to
+--retries times, limited to --max-memory-gb of address space and --timeout seconds, and logged to
+<site>/logs/.
+Progress is recorded in <site>/batch_progress.json, so re-running the same command resumes where
+the previous run stopped; --force reruns everything.
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+scripts_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+run_stage_path = os.path.join(scripts_dir, "batch", "run_stage.py")
+
+# Stage name -> (script relative to scripts/, stages it depends on)
+# 01_cartography is semi-automated (own API key, manual raster path) and is not run in batch.
+STAGES = {
+    "skeleton": ("02_dimensions/1-to_line_simplify_geometries_qgis.py", []),
+    "widths": ("02_dimensions/2-extract_dimensions_qgis.py", ["skeleton"]),
+    "clusters": ("03_cluster/1-cluster_analysis_qgis.py", ["widths"]),
+    "clusters_fig": ("03_cluster/2-variables_clustering_fig.R", ["clusters"]),
+    "population": ("04_population/1-population_estimates_qgis.py", []),
+    "volumes": ("05_volumes-labour/1-calculate_volumes.R", ["widths"]),
+    "labour_clusters": ("05_volumes-labour/2-labour_cluster_summaries.R", ["volumes", "clusters", "population"]),
+    "labour_totals": ("05_volumes-labour/3-total_labour_calculations.R", ["volumes", "clusters", "population"]),
+    "catchments": ("05_volumes-labour/4-platform_catchments_qgis.py", ["volumes", "population"]),
+    "bootstrap": ("05_volumes-labour/5-bootstrap_confidence_intervals_qgis.py",
+                  ["widths", "surviving_height", "clusters", "population"]),
+    "betweenness": ("06_centrality/1-centrality_analysis.R", ["clusters"]),
+    "closeness": ("06_centrality/2-closeness_centrality_analysis.R", ["clusters"]),
+    "surviving_height": ("S2_surviving_height/1-calculate_surviving_height_qgis.py", ["widths"]),
+}
+
+# Python stages that need neither PyQGIS nor Processing: run_stage.py runs them without starting QGIS
+NO_QGIS_STAGES = {"widths", "catchments", "bootstrap"}
+
+# Where each manifest input is placed inside a site directory
+SITE_INPUTS = {
+    "camellones": os.path.join("spatial_data", "shapefiles", "camellones", "camellones"),
+    "platforms": os.path.join("spatial_data", "shapefiles", "platforms", "platforms"),
+    "dem": os.path.join("spatial_data", "DEM", "DEM_fondodeadaptacion"),
+    "water_bodies": os.path.join("spatial_data", "shapefiles", "water_bodies", "ancient_courses"),
+}
+
+# Inputs a site may leave out; water_bodies is only read with "water_mask_mode": "polygons"
+OPTIONAL_SITE_INPUTS = {"water_bodies"}
+
+SITE_OUTPUT_DIRS = [
+    os.path.join("outputs", "data"),
+    os.path.join("outputs", "figures"),
+    os.path.join("outputs", "final_shapefiles"),
+    os.path.join("outputs", "tables"),
+    os.path.join("outputs", "temp"),
+    "logs",
+]
+
+
+# ----------------------------
+# Site set-up
+# ----------------------------
+def link_or_copy(src, dst):
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.symlink(os.path.abspath(src), dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def prepare_site(site, output_root):
+    """
+    Create the site directory with the repository layout and link the site's inputs into it.
+    Shapefiles bring their sidecar files (.shx, .dbf, .prj, ...) along.
+    """
+    site_dir = os.path.join(output_root, site["name"])
+    for d in SITE_OUTPUT_DIRS:
+        os.makedirs(os.path.join(site_dir, d), exist_ok=True)
+
+    if site.get("params", {}).get("water_mask_mode") == "polygons" and "water_bodies" not in site:
+        raise ValueError(f"Site {site['name']} uses water_mask_mode \"polygons\" but has no water_bodies input")
+
+    for key, target_stem in SITE_INPUTS.items():
+        if key not in site:
+            if key in OPTIONAL_SITE_INPUTS:
+                continue
+            raise ValueError(f"Site {site['name']} is missing input: {key}")
+        src = site[key]
+        src_stem, src_ext = os.path.splitext(src)
+        os.makedirs(os.path.dirname(os.path.join(site_dir, target_stem)), exist_ok=True)
+
+        if src_ext.lower() == ".shp":
+            src_dir = os.path.dirname(src) or "."
+            for fname in os.listdir(src_dir):
+                stem, ext = os.path.splitext(fname)
+                if stem == os.path.basename(src_stem):
+                    link_or_copy(os.path.join(src_dir, fname), os.path.join(site_dir, target_stem + ext))
+        else:
+            link_or_copy(src, os.path.join(site_dir, target_stem + src_ext))
+
+    # Root marker for here::here() in the R scripts
+    open(os.path.join(site_dir, ".here"), "a").close()
+
+    with open(os.path.join(site_dir, "site_params.json"), "w") as fp:
+        json.dump(site.get("params", {}), fp, indent=2)
+
+    return site_dir
+
+
+# ----------------------------
+# Progress (resumable)
+# ----------------------------
+def load_progress(site_dir):
+    path = os.path.join(site_dir, "batch_progress.json")
+    if os.path.exists(path):
+        with open(path) as fp:
+            return json.load(fp)
+    return {}
+
+
+def save_progress(site_dir, progress):
+    path = os.path.join(site_dir, "batch_progress.json")
+    with open(path + ".tmp", "w") as fp:
+        json.dump(progress, fp, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+# ----------------------------
+# Running one stage
+# ----------------------------
+def can_limit_memory():
+    # resource.prlimit (Linux) sets a limit on another, already running process
+    try:
+        import resource
+    except ImportError:
+        return False
+    return hasattr(resource, "prlimit")
+
+
+def limit_memory(pid, max_memory_bytes):
+    # Address-space limit on a started stage process. It is set from here rather than with preexec_fn,
+    # which is not safe while the scheduler's threads are running; the child has only just started, so
+    # it has not grown by the time the limit applies, and anything it starts later inherits the limit.
+    import resource
+    resource.prlimit(pid, resource.RLIMIT_AS, (max_memory_bytes, max_memory_bytes))
+
+
+def run_stage(site_dir, stage, python_exe, rscript_exe, max_memory_bytes, timeout):
+    script = os.path.join(scripts_dir, STAGES[stage][0])
+    if script.endswith(".R"):
+        cmd = [rscript_exe, script]
+    else:
+        cmd = [python_exe, run_stage_path, site_dir, script, os.path.join(site_dir, "site_params.json")]
+        if stage in NO_QGIS_STAGES:
+            cmd.append("--no-qgis")
+
+    # One thread per stage process; parallelism comes from running several stages at once
+    env = dict(os.environ, OMP_NUM_THREADS="1", GDAL_NUM_THREADS="1")
+
+    with open(os.path.join(site_dir, "logs", f"{stage}.log"), "a") as log:
+        log.write(f"\n=== {stage} started {datetime.now().isoformat(timespec='seconds')}\n")
+        log.flush()
+        proc = subprocess.Popen(cmd, cwd=site_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            if max_memory_bytes and can_limit_memory():
+                limit_memory(proc.pid, max_memory_bytes)
+            return proc.wait(timeout=timeout) == 0
+        except subprocess.TimeoutExpired:
+            log.write(f"=== {stage} timed out after {timeout} s\n")
+            return False
+        except ProcessLookupError:
+            # Exited before the limit could be set
+            return proc.wait() == 0
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+
+# ----------------------------
+# Scheduler
+# ----------------------------
+def run_batch(sites, args):
+    """
+    Schedule every (site, stage) across a pool of args.jobs workers. A stage becomes ready once all of
+    its dependencies are done for the same site; a stage that fails after all retries blocks only its
+    own dependants, and the other stages and sites carry on.
+    """
+    site_dirs = {}
+    progress = {}
+    for site in sites:
+        name = site["name"]
+        site_dirs[name] = prepare_site(site, args.output_root)
+        progress[name] = {} if args.force else load_progress(site_dirs[name])
+        # Stages interrupted or failed in a previous run start again
+        for stage, info in list(progress[name].items()):
+            if info.get("status") != "done":
+                del progress[name][stage]
+
+    def status(name, stage):
+        return progress[name].get(stage, {}).get("status")
+
+    def ready():
+        for name in site_dirs:
+            for stage, (_, deps) in STAGES.items():
+                if status(name, stage) is None and all(status(name, d) == "done" for d in deps):
+                    yield name, stage
+
+    def blocked(name, stage):
+        deps = STAGES[stage][1]
+        return any(status(name, d) == "failed" or blocked(name, d) for d in deps)
+
+    max_memory_bytes = int(args.max_memory_gb * 1024 ** 3) if args.max_memory_gb else None
+    if max_memory_bytes and not can_limit_memory():
+        print("--max-memory-gb needs resource.prlimit (Linux); stages run without a memory limit.")
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        running = {}
+        while True:
+            for name, stage in ready():
+                if len(running) >= args.jobs:
+                    break
+                attempts = progress[name].get(stage, {}).get("attempts", 0) + 1
+                progress[name][stage] = {"status": "running", "attempts": attempts}
+                save_progress(site_dirs[name], progress[name])
+                print(f"[{name}] {stage}: started (attempt {attempts})")
+                fut = pool.submit(
+                    run_stage, site_dirs[name], stage, args.python, args.rscript, max_memory_bytes, args.timeout
+                )
+                running[fut] = (name, stage)
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, stage = running.pop(fut)
+                info = progress[name][stage]
+                if fut.result():
+                    info.update(status="done", finished=datetime.now().isoformat(timespec="seconds"))
+                    print(f"[{name}] {stage}: done")
+                elif info["attempts"] <= args.retries:
+                    # Back to "not started" so ready() picks it up again
+                    info["status"] = None
+                    print(f"[{name}] {stage}: failed, retrying (see logs/{stage}.log)")
+                else:
+                    info["status"] = "failed"
+                    print(f"[{name}] {stage}: failed after {info['attempts']} attempts (see logs/{stage}.log)")
+                save_progress(site_dirs[name], progress[name])
+
+    # Summary
+    all_done = True
+    for name in site_dirs:
+        failed = [s for s in STAGES if status(name, s) == "failed"]
+        skipped = [s for s in STAGES if status(name, s) is None and blocked(name, s)]
+        if failed or skipped:
+            all_done = False
+            print(f"[{name}] failed: {', '.join(failed)}; not run: {', '.join(skipped) or '-'}")
+        else:
+            print(f"[{name}] all stages done")
+    return all_done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the mojana-fields pipeline for every site in a manifest.")
+    parser.add_argument("manifest", help="JSON manifest of sites (see sites_example.json)")
+    parser.add_argument("--output-root", help="Directory for per-site outputs (default: manifest output_root)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Stages run at once")
+    parser.add_argument("--retries", type=int, default=1, help="Retries per failed stage")
+    parser.add_argument("--max-memory-gb", type=float, default=None, help="Address-space limit per stage")
+    parser.add_argument("--timeout", type=float, default=None, help="Time limit per stage, in seconds")
+    parser.add_argument("--python", default=sys.executable, help="Python with QGIS (PyQGIS) available")
+    parser.add_argument("--rscript", default="Rscript", help="Rscript executable")
+    parser.add_argument("--force", action="store_true", help="Ignore recorded progress and rerun all stages")
+    args = parser.parse_args()
+
+    with open(args.manifest) as fp:
+        manifest = json.load(fp)
+
+    manifest_dir = os.path.dirname(os.path.abspath(args.manifest))
+    args.output_root = os.path.abspath(args.output_root or os.path.join(manifest_dir, manifest.get("output_root", "sites")))
+
+    # Input paths in the manifest are relative to the manifest file
+    sites = manifest["sites"]
+    for site in sites:
+        for key in SITE_INPUTS:
+            if key in site:
+                site[key] = os.path.join(manifest_dir, site[key])
+
+    sys.exit(0 if run_batch(sites, args) else 1)
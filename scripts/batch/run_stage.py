@@ -0,0 +1,81 @@
+"""
+Run one pipeline script headless for one site, as if from the QGIS Python Console.
+
+Called by run_sites.py (one process per stage):
+    python run_stage.py <site_dir> <script.py> [site_params.json] [--no-qgis]
+
+The scripts compute their paths from QgsProject.instance().fileName(), so the project file name is
+pointed at <site_dir>/project.qgz, and they rely on the names the console pre-imports (qgis.core,
+processing, iface, ...), which are recreated here. Site parameters are passed as SITE_PARAMS.
+
+With --no-qgis, QGIS is not started at all: the script gets only SITE_PARAMS and PROJECT_DIR (the site
+directory), which the OGR / Shapely / NumPy stages use instead of QgsProject. Those start in a fraction of a
+second instead of paying for QgsApplication, Processing and the GRASS provider.
+"""
+import os
+import sys
+import json
+import runpy
+
+# Repository root, so the scripts can import the mojana_fields package when the project is a site directory
+repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def init_qgis():
+    from qgis.core import QgsApplication
+
+    QgsApplication.setPrefixPath(os.environ.get("QGIS_PREFIX_PATH", ""), True)
+    app = QgsApplication([], False)
+    app.initQgis()
+
+    # Processing framework (+ GRASS provider, needed for v.voronoi.skeleton)
+    from processing.core.Processing import Processing
+    Processing.initialize()
+    try:
+        from grassprovider.Grass7AlgorithmProvider import Grass7AlgorithmProvider
+        QgsApplication.processingRegistry().addProvider(Grass7AlgorithmProvider())
+    except ImportError:
+        print("GRASS provider not found; grass7: algorithms will be unavailable.")
+
+    return app
+
+
+def console_namespace(site_params):
+    # Names available in the QGIS Python Console without an import
+    import qgis.core
+    import qgis.analysis
+    import processing
+
+    namespace = {name: getattr(qgis.core, name) for name in dir(qgis.core) if not name.startswith("_")}
+    namespace.update({name: getattr(qgis.analysis, name) for name in dir(qgis.analysis) if not name.startswith("_")})
+    namespace["processing"] = processing
+    namespace["iface"] = None
+    namespace["SITE_PARAMS"] = site_params
+    return namespace
+
+
+if __name__ == "__main__":
+    use_qgis = "--no-qgis" not in sys.argv[1:]
+    args = [a for a in sys.argv[1:] if a != "--no-qgis"]
+    site_dir, script_path = args[0], args[1]
+    site_params = {}
+    if len(args) > 2:
+        with open(args[2]) as fp:
+            site_params = json.load(fp)
+
+    sys.path.insert(0, repo_root)
+
+    if not use_qgis:
+        namespace = {"SITE_PARAMS": site_params, "PROJECT_DIR": os.path.abspath(site_dir)}
+        runpy.run_path(script_path, init_globals=namespace, run_name="__main__")
+        sys.exit(0)
+
+    app = init_qgis()
+
+    from qgis.core import QgsProject
+    QgsProject.instance().setFileName(os.path.join(os.path.abspath(site_dir), "project.qgz"))
+
+    try:
+        runpy.run_path(script_path, init_globals=console_namespace(site_params), run_name="__main__")
+    finally:
+        app.exitQgis()
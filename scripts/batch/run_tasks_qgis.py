@@ -0,0 +1,131 @@
+import os
+import sys
+
+from qgis.core import QgsProject, QgsVectorLayer, QgsVectorFileWriter
+
+# Runs the independent stages of the pipeline in the background through the QGIS task manager, from the
+# QGIS Python Console, so the project stays usable during a long run:
+#   satellite polygonization (01_cartography/2), skeleton + longest lines (02_dimensions/1), population (04)
+# The three branches run at the same time; within a branch each step waits for the previous one.
+# Progress shows in the task manager (status bar); `pipeline.cancel()` in the console stops the run.
+# The GRASS skeleton cannot run in a worker thread, so it runs in the main thread (QGIS pauses meanwhile),
+# and the blue mask steps only react to cancellation between steps.
+# The DEM water removal step no longer exists: water is masked while the surviving height stage reads the DEM.
+
+# Get current project path
+p = os.path.dirname(QgsProject.instance().fileName())
+
+# Shared helpers from the mojana_fields package at the project root
+if p not in sys.path:
+    sys.path.insert(0, p)
+from mojana_fields.raster import create_range_mask
+from mojana_fields.qgis_adapters import estimate_population, write_longest_lines
+from mojana_fields.qgis_tasks import StageGraph
+
+# Site parameters passed in by the batch runner (scripts/batch) override the defaults below
+site_params = globals().get("SITE_PARAMS", {})
+
+# NB! Satellite imagery downloaded using your own API in script "download_tiles.R"; leave empty to skip polygonization
+raster_path = ""
+
+# Same settings as 2-polygonise_satellite_qgis.py
+blue_band = 3
+blue_min, blue_max = 75, 100
+
+# Same settings as 04_population/1-population_estimates_qgis.py
+sqm_per_house = site_params.get("sqm_per_house", 500.0)
+people_per_house = site_params.get("people_per_house", 5)
+
+# Paths (as in the stage scripts)
+out_dir = os.path.join(p, "outputs", "temp")
+camellones_path = os.path.join(p, "spatial_data", "shapefiles", "camellones", "camellones.shp")
+platforms_path = os.path.join(p, "spatial_data", "shapefiles", "platforms", "platforms.shp")
+
+blue_mask_path = os.path.join(out_dir, "blue_mask.tif")
+no_data_mask_path = os.path.join(out_dir, "no_data_blue_mask.tif")
+filled_mask_path = os.path.join(out_dir, "filled_blue_mask.tif")
+filled_binary_path = os.path.join(out_dir, "filled_blue_mask_binary.tif")
+filled_binary_nodata_path = os.path.join(out_dir, "filled_blue_mask_binary_nodata.tif")
+sieved_mask_path = os.path.join(out_dir, "sieved_blue_mask.tif")
+polygons_all_path = os.path.join(out_dir, "blue_mask_polygons_all.gpkg")
+polygons_mask_path = os.path.join(out_dir, "blue_mask_polygons_dn1.gpkg")
+
+# The simplified camellones are written to file: layers cannot be passed between task threads
+simplified_path = os.path.join(out_dir, "simplified_camellones.gpkg")
+skeleton_file_path = os.path.join(out_dir, "output_line_layer.gpkg")
+longest_line_output_path = os.path.join(out_dir, "longest_line_output.gpkg")
+
+out_polys_path = os.path.join(p, "outputs", "final_shapefiles", "platforms_houses_pop.gpkg")
+csv_population_path = os.path.join(p, "outputs", "data", "platforms_houses_pop.csv")
+
+
+def longest_lines(task=None):
+    # write_longest_lines reports errors as a code; raising marks the step as failed
+    err_code, err_msg = write_longest_lines(skeleton_file_path, longest_line_output_path, task=task)
+    if err_code != QgsVectorFileWriter.NoError:
+        raise RuntimeError(f"Error saving longest line layer ({err_code}): {err_msg}")
+
+
+def add_vector(path, name):
+    # on_finished callback: runs in the main thread, where adding layers to the project is safe
+    return lambda _: QgsProject.instance().addMapLayer(QgsVectorLayer(path, name, "ogr"))
+
+
+pipeline = StageGraph()
+
+# ----------------------------
+# Satellite polygonization (steps as in 2-polygonise_satellite_qgis.py)
+# ----------------------------
+if os.path.isfile(raster_path):
+    pipeline.add_function("blue mask", create_range_mask, raster_path, blue_band, blue_min, blue_max, blue_mask_path)
+    pipeline.add_algorithm("blue mask nodata", "gdal:translate", {
+        "INPUT": blue_mask_path, "NODATA": 0, "COPY_SUBDATASETS": False, "OPTIONS": "", "EXTRA": "",
+        "DATA_TYPE": 0, "OUTPUT": no_data_mask_path
+    }, depends_on=["blue mask"])
+    pipeline.add_algorithm("fill nodata", "gdal:fillnodata", {
+        "INPUT": no_data_mask_path, "BAND": 1, "DISTANCE": 3, "ITERATIONS": 0, "MASK_LAYER": None,
+        "OPTIONS": "", "EXTRA": "", "OUTPUT": filled_mask_path
+    }, depends_on=["blue mask nodata"])
+    pipeline.add_function("re-binarize", create_range_mask, filled_mask_path, 1, 0.5, 1e9, filled_binary_path,
+                          depends_on=["fill nodata"])
+    pipeline.add_algorithm("binary nodata", "gdal:translate", {
+        "INPUT": filled_binary_path, "NODATA": 0, "COPY_SUBDATASETS": False, "OPTIONS": "", "EXTRA": "",
+        "DATA_TYPE": 1, "OUTPUT": filled_binary_nodata_path
+    }, depends_on=["re-binarize"])
+    pipeline.add_algorithm("sieve", "gdal:sieve", {
+        "INPUT": filled_binary_nodata_path, "THRESHOLD": 500, "EIGHT_CONNECTEDNESS": True, "NO_MASK": True,
+        "MASK": None, "OPTIONS": "", "EXTRA": "", "OUTPUT": sieved_mask_path
+    }, depends_on=["binary nodata"])
+    pipeline.add_algorithm("polygonize", "gdal:polygonize", {
+        "INPUT": sieved_mask_path, "BAND": 1, "FIELD": "DN", "EIGHT_CONNECTEDNESS": True, "EXTRA": "",
+        "OUTPUT": polygons_all_path
+    }, depends_on=["sieve"])
+    pipeline.add_algorithm("keep DN = 1", "native:extractbyattribute", {
+        "INPUT": polygons_all_path, "FIELD": "DN", "OPERATOR": 0, "VALUE": 1, "OUTPUT": polygons_mask_path
+    }, depends_on=["polygonize"], on_finished=add_vector(polygons_mask_path, "Blue_Mask_Polygons_DN1"))
+else:
+    print("raster_path not set: satellite polygonization skipped.")
+
+# ----------------------------
+# Skeleton and longest lines (steps as in 02_dimensions/1-to_line_simplify_geometries_qgis.py)
+# ----------------------------
+pipeline.add_algorithm("simplify", "native:simplifygeometries", {
+    "INPUT": camellones_path, "TOLERANCE": 0.1, "OUTPUT": simplified_path
+})
+pipeline.add_algorithm("skeleton", "grass7:v.voronoi.skeleton", {
+    "input": simplified_path, "smoothness": 0.5, "thin": -1, "-a": False, "-s": True, "-l": False, "-t": False,
+    "output": skeleton_file_path, "GRASS_SNAP_TOLERANCE_PARAMETER": -1, "GRASS_MIN_AREA_PARAMETER": 0.5,
+    "GRASS_OUTPUT_TYPE_PARAMETER": 0
+}, depends_on=["simplify"])
+pipeline.add_function("longest lines", longest_lines, pass_task=True,
+                      depends_on=["skeleton"], on_finished=add_vector(longest_line_output_path, "Longest Line Layer"))
+
+# ----------------------------
+# Population estimates (04_population/1-population_estimates_qgis.py)
+# ----------------------------
+pipeline.add_function("population", estimate_population, platforms_path, out_polys_path, csv_population_path,
+                      sqm_per_house, people_per_house, pass_task=True,
+                      on_finished=add_vector(out_polys_path, "Camellones Houses Pop"))
+
+pipeline.submit()
+print(f"Submitted {len(pipeline.tasks)} steps to the task manager; `pipeline.cancel()` stops the run.")